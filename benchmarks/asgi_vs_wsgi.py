@@ -0,0 +1,159 @@
+"""Requests/sec and memory per connection, WSGI against ASGI.
+
+    python benchmarks/asgi_vs_wsgi.py --idle 500 --threads 16 --duration 10
+
+Each deployment runs in its own process: 'wsgi' is a thread per connection
+server (like gunicorn's gthread workers), 'asgi' is uvicorn serving
+tango_with_django_project/asgi.py. It is skipped unless asgiref and uvicorn
+are installed. --idle connections send half a request and then wait, as
+slow clients do. The memory they cost is measured from the server's RSS,
+then --threads clients request pages for --duration seconds while the idle
+connections are still open.
+"""
+import argparse
+import http.client
+import logging
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import common
+
+
+def rss_kb(pid):
+    with open('/proc/%d/status' % pid) as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def serve(kind, port):
+    from django.conf import settings
+    from rango.models import Category
+
+    common.setup_database()
+    settings.ALLOWED_HOSTS = ['*']
+    logging.getLogger('rango.performance').setLevel(logging.ERROR)
+    for i in range(100):
+        Category.objects.create(name='Category %d' % i)
+
+    if kind == 'wsgi':
+        from django.core.wsgi import get_wsgi_application
+        from wsgiref.simple_server import make_server
+        server = make_server('127.0.0.1', port, get_wsgi_application(), server_class=common.ThreadingWSGIServer,
+                             handler_class=common.QuietHandler)
+        print('ready', flush=True)
+        server.serve_forever()
+    else:
+        import uvicorn
+        from tango_with_django_project.asgi import application
+        print('ready', flush=True)
+        uvicorn.run(application, host='127.0.0.1', port=port, log_level='warning')
+
+
+def wait_for(port):
+    for i in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start')
+
+
+def load(port, n_threads, duration):
+    paths = ['/rango/', '/rango/about/'] + ['/rango/category/category-%d/' % i for i in range(100)]
+    samples, errors = [], []
+    deadline = time.time() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', random.choice(paths))
+                conn.getresponse().read()
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(e)
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            samples.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = common.summarize('load', samples)
+    result['requests_per_second'] = round(len(samples) / float(duration), 1)
+    result['errors'] = len(errors)
+    return result
+
+
+def run(kind, n_idle, n_threads, duration):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, __file__, '--serve', kind, '--port', str(port)],
+                              stdout=subprocess.PIPE)
+    try:
+        server.stdout.readline()
+        wait_for(port)
+        # warm up, so that the code and caches are loaded before measuring
+        load(port, 1, 1)
+        before = rss_kb(server.pid)
+        idle = []
+        for i in range(n_idle):
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.sendall(b'GET /rango/about/ HTTP/1.1\r\nHost: 127.0.0.1\r\n')
+            idle.append(sock)
+        time.sleep(2)
+        per_connection = (rss_kb(server.pid) - before) / float(max(n_idle, 1))
+        result = load(port, n_threads, duration)
+        result['kb_per_idle_connection'] = round(per_connection, 1)
+        for sock in idle:
+            sock.close()
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--idle', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    kinds = ['wsgi']
+    try:
+        import asgiref.wsgi
+        import uvicorn
+        kinds.append('asgi')
+    except ImportError:
+        print('asgi skipped: pip install asgiref uvicorn')
+    for kind in kinds:
+        result = run(kind, args.idle, args.threads, args.duration)
+        print('{0:<5} {requests_per_second:>8} req/s  p50={p50_ms:>8.3f}ms  p99={p99_ms:>9.3f}ms  '
+              '{errors} errors  {kb_per_idle_connection} KB per idle connection'.format(kind, **result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Serving media/cat.jpg through Django's static() view vs rango.assets.AssetServer.
+
+    python benchmarks/asset_serving.py --requests 2000
+
+Both are called as WSGI applications in process, so the numbers are
+the cost of the Python side of a request, not of the network.
+"""
+import argparse
+import time
+from wsgiref.util import FileWrapper, setup_testing_defaults
+
+import common
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from rango.assets import AssetServer
+
+
+def request(application, path, **headers):
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'wsgi.file_wrapper': FileWrapper}
+    environ.update(headers)
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, response_headers, exc_info=None):
+        status.append(status_line)
+
+    body = application(environ, start_response)
+    size = sum(len(chunk) for chunk in body)
+    if hasattr(body, 'close'):
+        body.close()
+    return status[0], size
+
+
+def run(name, application, path, n_requests, **headers):
+    status, size = request(application, path, **headers)
+    samples = []
+    start = time.perf_counter()
+    for i in range(n_requests):
+        samples.append(common.timed(request, application, path, **headers))
+    elapsed = time.perf_counter() - start
+    row = common.summarize(name, samples)
+    print('{0}  {1:>8.0f} req/s  ({2}, {3} bytes)'.format(
+        '{name:<30} p50={p50_ms:>7.3f}ms p99={p99_ms:>7.3f}ms'.format(**row),
+        n_requests / elapsed, status, size))
+
+
+def etag(application, path):
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'HEAD'}
+    setup_testing_defaults(environ)
+    headers = []
+    application(environ, lambda status, response_headers, exc_info=None: headers.extend(response_headers))
+    return dict(headers)['ETag']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    settings.ALLOWED_HOSTS = ['*']
+    django_app = get_wsgi_application()
+    asset_app = AssetServer(django_app, [(settings.MEDIA_URL, settings.MEDIA_ROOT)])
+    path = settings.MEDIA_URL + 'cat.jpg'
+
+    run('django static() view', django_app, path, args.requests)
+    run('AssetServer', asset_app, path, args.requests)
+    run('AssetServer, Range', asset_app, path, args.requests, HTTP_RANGE='bytes=0-1023')
+    run('AssetServer, If-None-Match', asset_app, path, args.requests,
+        HTTP_IF_NONE_MATCH=etag(asset_app, path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+# make the project importable when run as `python benchmarks/<script>.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tango_with_django_project.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+
+def setup_database():
+    # Benchmarks run against a throwaway sqlite file, never db.sqlite3.
+    # A file (rather than :memory:) lets other threads share the data.
+    path = os.path.join(tempfile.mkdtemp(prefix='rango-bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['TEST'] = {'NAME': path}
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    return path
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(application):
+    # serves the application on a free port from a background thread,
+    # one thread per connection; returns the server and its port
+    server = make_server('127.0.0.1', 0, application, server_class=ThreadingWSGIServer,
+                         handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def summarize(name, samples):
+    # samples are in seconds, reported in milliseconds
+    return {
+        'name': name,
+        'requests': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def print_table(rows):
+    for row in rows:
+        print('{name:<30} n={requests:<6} p50={p50_ms:>8.3f}ms p99={p99_ms:>8.3f}ms'.format(**row))
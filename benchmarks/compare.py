@@ -0,0 +1,58 @@
+"""Compare two benchmark suite results.
+
+    python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Prints the change in p50/p99 latency and query counts per view. The exit
+status is 1 when a view made more queries, or got slower than
+--threshold percent at p50.
+"""
+import argparse
+import json
+import sys
+
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) * 100.0 / old
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=20.0, help='Allowed p50 slowdown in percent.')
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old['scale'] != new['scale']:
+        print('warning: comparing scale %s with %s' % (old['scale'], new['scale']))
+
+    print('%s -> %s (%s pages)' % (old['commit'], new['commit'], new['scale']))
+    regressions = []
+    for name in sorted(set(old['views']) | set(new['views'])):
+        if name not in old['views'] or name not in new['views']:
+            print('{:<15} only in {}'.format(name, args.old if name in old['views'] else args.new))
+            continue
+        a, b = old['views'][name], new['views'][name]
+        p50 = change(a['p50_ms'], b['p50_ms'])
+        print('{:<15} p50 {:>8.3f} -> {:>8.3f}ms ({:+.1f}%)  p99 {:>8.3f} -> {:>8.3f}ms ({:+.1f}%)  '
+              'queries {} -> {}'.format(name, a['p50_ms'], b['p50_ms'], p50, a['p99_ms'], b['p99_ms'],
+                                        change(a['p99_ms'], b['p99_ms']), a['max_queries'], b['max_queries']))
+        if b['max_queries'] > a['max_queries'] or p50 > args.threshold:
+            regressions.append(name)
+
+    a, b = old['load'], new['load']
+    print('{:<15} {} -> {} req/s ({:+.1f}%)'.format('load', a['requests_per_second'], b['requests_per_second'],
+                                                   change(a['requests_per_second'], b['requests_per_second'])))
+
+    if regressions:
+        print('regressions: %s' % ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
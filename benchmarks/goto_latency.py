@@ -0,0 +1,85 @@
+"""Redirect latency of /rango/goto/ with view logging on, off and inline.
+
+    python benchmarks/goto_latency.py --requests 2000 --pages 1000
+
+A background thread keeps the database under write load while the
+requests are timed. The 'inline' run increments Page.views inside the
+request, which is what the counter buffer replaces.
+"""
+import argparse
+import random
+import threading
+
+import common
+
+from django.db import connection
+from django.db.models import F
+from django.test import Client
+from django.test.utils import override_settings
+from rango import counters
+from rango.models import Category, Page
+
+
+def seed(n_pages):
+    category = Category.objects.create(name='Benchmark')
+    Page.objects.bulk_create(
+        Page(category=category, title='Page %d' % i, url='http://example.com/%d' % i)
+        for i in range(n_pages)
+    )
+    return list(Page.objects.values_list('id', flat=True))
+
+
+def write_load(page_ids, stop):
+    while not stop.is_set():
+        Page.objects.filter(id=random.choice(page_ids)).update(views=F('views') + 1)
+    connection.close()
+
+
+def inline_goto(client, page_id):
+    # what a naive implementation would do before redirecting
+    Page.objects.filter(id=page_id).update(views=F('views') + 1)
+    with override_settings(RANGO_TRACK_PAGE_VIEWS=False):
+        return client.get('/rango/goto/', {'page_id': page_id})
+
+
+def run(name, n_requests, page_ids, track=True, inline=False):
+    client = Client()
+    samples = []
+    for i in range(n_requests):
+        page_id = random.choice(page_ids)
+        if inline:
+            samples.append(common.timed(inline_goto, client, page_id))
+        else:
+            with override_settings(RANGO_TRACK_PAGE_VIEWS=track):
+                samples.append(common.timed(client.get, '/rango/goto/', {'page_id': page_id}))
+    return common.summarize(name, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=1000)
+    args = parser.parse_args()
+
+    common.setup_database()
+    page_ids = seed(args.pages)
+
+    stop = threading.Event()
+    writer = threading.Thread(target=write_load, args=(page_ids, stop))
+    writer.daemon = True
+    writer.start()
+    try:
+        rows = [
+            run('logging disabled', args.requests, page_ids, track=False),
+            run('logging enabled (buffered)', args.requests, page_ids, track=True),
+            run('logging inline', args.requests, page_ids, inline=True),
+        ]
+    finally:
+        stop.set()
+        writer.join()
+    counters.flush()
+    common.print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Logins per second, and page latency during a burst of logins.
+
+    python benchmarks/login_storm.py [--login-threads 16] [--duration 10]
+
+For each authentication backend, --login-threads clients log in over
+and over (GET the form, POST the credentials) against a threaded WSGI
+server, while --page-threads clients fetch category pages. Reported:
+successful and refused (503) logins per second, and the page latency
+with and without the storm.
+"""
+import argparse
+import http.client
+import logging
+import re
+import threading
+import time
+
+import common
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from rango.models import Category
+
+BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend',
+    'rango.passwords.PooledPasswordBackend',
+]
+
+PASSWORD = 'benchmark-pw-123'
+
+CSRF_INPUT = re.compile(r'name=["\']csrfmiddlewaretoken["\'] value=["\']([^"\']+)')
+CSRF_COOKIE = re.compile(r'csrftoken=([^;]+)')
+
+
+def login(port, username):
+    # returns the status of the POST
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    try:
+        conn.request('GET', '/accounts/login/')
+        response = conn.getresponse()
+        token = CSRF_INPUT.search(response.read().decode('utf-8')).group(1)
+        cookie = CSRF_COOKIE.search(response.getheader('Set-Cookie')).group(1)
+        body = 'csrfmiddlewaretoken=%s&username=%s&password=%s' % (token, username, PASSWORD)
+        conn.request('POST', '/accounts/login/', body, {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Cookie': 'csrftoken=%s' % cookie,
+        })
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def run(port, paths, n_login_threads, n_page_threads, duration):
+    statuses, page_samples = [], []
+    deadline = time.time() + duration
+
+    def login_worker(index):
+        while time.time() < deadline:
+            statuses.append(login(port, 'user%d' % index))
+
+    def page_worker(index):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        while time.time() < deadline:
+            start = time.perf_counter()
+            conn.request('GET', paths[len(page_samples) % len(paths)])
+            conn.getresponse().read()
+            page_samples.append(time.perf_counter() - start)
+        conn.close()
+
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(n_login_threads)]
+    threads += [threading.Thread(target=page_worker, args=(i,)) for i in range(n_page_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = common.summarize('pages', page_samples)
+    result['logins_per_second'] = round(statuses.count(302) / float(duration), 1)
+    result['refused_per_second'] = round(statuses.count(503) / float(duration), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--page-threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    common.setup_database()
+    settings.ALLOWED_HOSTS = ['*']
+    logging.getLogger('rango.performance').setLevel(logging.ERROR)
+    cache.clear()
+    for i in range(max(100, args.login_threads)):
+        Category.objects.create(name='Category %d' % i)
+    for i in range(args.login_threads):
+        User.objects.create_user('user%d' % i, password=PASSWORD)
+    paths = ['/rango/category/category-%d/' % i for i in range(100)]
+
+    server, port = common.start_server(get_wsgi_application())
+    baseline = run(port, paths, 0, args.page_threads, args.duration / 2)
+    print('no logins: pages p50={p50_ms:.3f}ms p99={p99_ms:.3f}ms'.format(**baseline))
+    for backend in BACKENDS:
+        settings.AUTHENTICATION_BACKENDS = [backend]
+        result = run(port, paths, args.login_threads, args.page_threads, args.duration)
+        print('{}: {logins_per_second} logins/s, {refused_per_second} refused/s, '
+              'pages p50={p50_ms:.3f}ms p99={p99_ms:.3f}ms'.format(backend.rsplit('.', 1)[1], **result))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Query latency of the full text search index.
+
+    python benchmarks/search_latency.py --pages 1000000 --backend fts5
+
+Pages are seeded with random titles drawn from a vocabulary of
+--vocabulary words, then random one and two word queries are timed.
+A small vocabulary means every query matches (and ranks) a large
+share of the table, which is the worst case for the index.
+"""
+import argparse
+import random
+
+import common
+
+from django.test.utils import override_settings
+from rango import search
+from rango.bulk import BulkLoader
+
+WORDS = ('python django flask bottle tutorial guide official docs tango rango '
+         'learn think scientist minutes rocks web framework template model view '
+         'query cache index search database sqlite postgres deploy test').split()
+
+
+def vocabulary(size):
+    words = list(WORDS)
+    while len(words) < size:
+        words.append(''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for i in range(7)))
+    return words
+
+
+def rows(n_pages, n_categories, words):
+    for i in range(n_pages):
+        title = ' '.join(random.sample(words, 4))
+        yield {'category': 'Category %d' % (i % n_categories), 'title': '%s %d' % (title, i),
+               'url': 'http://%s.example.com/%d' % (random.choice(words), i), 'views': 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=100000)
+    parser.add_argument('--categories', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--backend', choices=('fts5', 'memory'), default='fts5')
+    args = parser.parse_args()
+
+    common.setup_database()
+    with override_settings(RANGO_SEARCH_BACKEND=args.backend):
+        words = vocabulary(args.vocabulary)
+        loader = BulkLoader(batch_size=5000).load(rows(args.pages, args.categories, words))
+        print('seeded {0} pages ({1:.0f} rows/sec)'.format(loader.rows, loader.rows_per_second))
+
+        search.search('warm up')
+        results = []
+        for n_words in (1, 2):
+            samples = []
+            for i in range(args.queries):
+                query = ' '.join(random.sample(words, n_words))
+                samples.append(common.timed(search.search, query, 0, 10))
+            results.append(common.summarize('%s, %d word(s)' % (args.backend, n_words), samples))
+        common.print_table(results)
+
+
+if __name__ == '__main__':
+    main()
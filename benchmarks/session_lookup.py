@@ -0,0 +1,102 @@
+"""Session lookup latency as django_session grows, and the expired sweep.
+
+    python benchmarks/session_lookup.py --sizes 10000,100000,1000000,10000000
+
+At each table size, random sessions are loaded through Django's database
+engine and through rango.sessions, once with the session in the cache and
+once without. A tenth of the rows are expired; at the largest size they are
+deleted by sweep_expired() in a background thread while lookups go on,
+to show the sweep doesn't lock out readers.
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import timedelta
+
+import common
+
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+from rango import sessions
+
+BATCH = 50000
+
+
+def key(i):
+    return 's%031d' % i
+
+
+def grow(start, stop, session_data):
+    now = timezone.now()
+    expired, current = now - timedelta(days=1), now + timedelta(days=14)
+    with connection.cursor() as cursor:
+        for offset in range(start, stop, BATCH):
+            rows = [(key(i), session_data, expired if i % 10 == 0 else current)
+                    for i in range(offset, min(offset + BATCH, stop))]
+            with transaction.atomic():
+                cursor.executemany('INSERT INTO django_session (session_key, session_data, expire_date) '
+                                   'VALUES (%s, %s, %s)', rows)
+
+
+def sample_keys(size, n):
+    # the expired rows (multiples of ten) aren't found, skip them
+    return [key(random.randrange(size // 10) * 10 + random.randint(1, 9)) for i in range(n)]
+
+
+def lookups(store_class, keys, clear_cache):
+    samples = []
+    for session_key in keys:
+        if clear_cache:
+            caches[settings.SESSION_CACHE_ALIAS].clear()
+        start = time.perf_counter()
+        store_class(session_key).load()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    common.setup_database()
+    session_data = DBStore().encode({'visits': 3, 'last_visit': '2026-10-17 10:00:00', '_auth_user_id': '1'})
+    size = 0
+    for target in [int(s) for s in args.sizes.split(',')]:
+        start = time.time()
+        grow(size, target, session_data)
+        size = target
+        print('{0} rows (inserted in {1:.1f}s)'.format(size, time.time() - start))
+        keys = sample_keys(size, args.lookups)
+        rows = [common.summarize('  db engine', lookups(DBStore, keys, False)),
+                common.summarize('  rango, not cached', lookups(sessions.SessionStore, keys, True))]
+        # the last run left the sessions in the cache
+        lookups(sessions.SessionStore, keys, False)
+        rows.append(common.summarize('  rango, cached', lookups(sessions.SessionStore, keys, False)))
+        common.print_table(rows)
+
+    sweep = {}
+
+    def sweeper():
+        start = time.time()
+        sweep['deleted'] = sessions.sweep_expired()
+        sweep['seconds'] = time.time() - start
+        connection.close()
+
+    thread = threading.Thread(target=sweeper)
+    thread.start()
+    samples = []
+    while thread.is_alive():
+        samples.extend(lookups(DBStore, sample_keys(size, 100), False))
+    thread.join()
+    print('swept {deleted} expired sessions in {seconds:.1f}s, meanwhile:'.format(**sweep))
+    common.print_table([common.summarize('  db engine', samples)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Concurrent reads and writes on SQLite, with and without the pragmas.
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --duration 10
+
+Readers list the most viewed pages of a category and load a session;
+writers add to the views of a page (as a counter flush does) and save a
+session. Each profile runs in its own process against a new database
+file, since the journal mode is stored in the file: 'default' is SQLite
+as it comes, 'tuned' applies RANGO_SQLITE_PRAGMAS.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import common
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import OperationalError, connection
+from django.db.models import F
+from rango.bulk import BulkLoader
+from rango.models import Page
+
+N_PAGES = 20000
+N_CATEGORIES = 200
+N_SESSIONS = 1000
+
+
+def seed():
+    BulkLoader(batch_size=5000).load({'category': 'Category %d' % (i % N_CATEGORIES), 'title': 'Page %d' % i,
+                                      'url': 'http://example.com/%d' % i, 'views': i}
+                                     for i in range(N_PAGES))
+    keys = []
+    for i in range(N_SESSIONS):
+        session = SessionStore()
+        session['visits'] = i
+        session.create()
+        keys.append(session.session_key)
+    return keys
+
+
+def read(keys):
+    category_id = random.randint(1, N_CATEGORIES)
+    list(Page.objects.filter(category_id=category_id).order_by('-views', '-id')[:20])
+    SessionStore(random.choice(keys)).load()
+
+
+def write(keys):
+    Page.objects.filter(pk=random.randint(1, N_PAGES)).update(views=F('views') + 1)
+    session = SessionStore(random.choice(keys))
+    session['visits'] = session.get('visits', 0) + 1
+    session.save()
+
+
+def run(n_readers, n_writers, duration):
+    keys = seed()
+    samples = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    deadline = time.time() + duration
+
+    def worker(kind, operation):
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(keys)
+            except OperationalError:
+                # "database is locked" once the busy timeout has passed
+                errors[kind] += 1
+                continue
+            samples[kind].append(time.perf_counter() - start)
+        connection.close()
+
+    threads = [threading.Thread(target=worker, args=('read', read)) for i in range(n_readers)]
+    threads += [threading.Thread(target=worker, args=('write', write)) for i in range(n_writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = []
+    for kind in ('read', 'write'):
+        row = common.summarize(kind, samples[kind])
+        row['per_second'] = round(len(samples[kind]) / float(duration), 1)
+        row['errors'] = errors[kind]
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--profile', choices=['default', 'tuned'], help='Run one profile, print JSON.')
+    args = parser.parse_args()
+
+    if args.profile:
+        if args.profile == 'default':
+            settings.RANGO_SQLITE_PRAGMAS = {}
+        common.setup_database()
+        print(json.dumps(run(args.readers, args.writers, args.duration)))
+        return
+
+    for profile in ('default', 'tuned'):
+        output = subprocess.check_output([sys.executable, __file__, '--profile', profile,
+                                          '--readers', str(args.readers), '--writers', str(args.writers),
+                                          '--duration', str(args.duration)])
+        for row in json.loads(output.decode('utf-8').splitlines()[-1]):
+            print('{0:<8} {name:<6} {per_second:>8} ops/s  p50={p50_ms:>8.3f}ms  p99={p99_ms:>9.3f}ms  '
+                  '{errors} errors'.format(profile, **row))
+
+
+if __name__ == '__main__':
+    main()
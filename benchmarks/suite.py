@@ -0,0 +1,220 @@
+"""Benchmark suite for the rango views.
+
+    python benchmarks/suite.py --scale 100k
+    python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Seeds a synthetic dataset with the bulk loader, then:
+
+* drives every view through the test client, recording latency and the
+  number of queries, which must stay within QUERY_BUDGETS;
+* runs a threaded load generator against a WSGI server for
+  --duration seconds.
+
+Results are written as JSON (see --output) so runs can be compared
+across commits. The exit status is 1 when a query budget is exceeded.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import common
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rango import caching, counters
+from rango.bulk import BulkLoader
+from rango.models import Category
+
+SCALES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+PAGES_PER_CATEGORY = 100
+
+# the most queries a request to each view may make, cached or not
+QUERY_BUDGETS = {
+    'index': 6,
+    'about': 4,
+    'show_category': 6,
+    'add_category': 12,
+    'add_page': 12,
+    'register': 12,
+    'login': 8,
+}
+
+PASSWORD = 'benchmark-pw-123'
+
+
+def rows(n_pages):
+    for i in range(n_pages):
+        yield {'category': 'Category %d' % (i // PAGES_PER_CATEGORY), 'title': 'Page %d' % i,
+               'url': 'http://example.com/%d' % i, 'views': random.randint(0, 1000)}
+
+
+def seed(n_pages):
+    loader = BulkLoader(batch_size=5000).load(rows(n_pages))
+    User.objects.create_user('benchmark', password=PASSWORD)
+    return {'pages': loader.rows, 'rows_per_second': round(loader.rows_per_second)}
+
+
+class Recorder(object):
+
+    def __init__(self):
+        self.samples = {}
+        self.queries = {}
+
+    def request(self, name, method, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = method(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError('%s answered %d' % (name, response.status_code))
+        self.samples.setdefault(name, []).append(elapsed)
+        self.queries[name] = max(self.queries.get(name, 0), len(queries.captured_queries))
+        return response
+
+    def results(self):
+        results = {}
+        for name, samples in sorted(self.samples.items()):
+            row = common.summarize(name, samples)
+            row['max_queries'] = self.queries[name]
+            row['query_budget'] = QUERY_BUDGETS[name]
+            results[name] = row
+        return results
+
+
+def drive_views(n_requests):
+    recorder = Recorder()
+    slugs = list(Category.objects.values_list('slug', flat=True)[:1000])
+
+    anonymous = Client()
+    for i in range(n_requests):
+        recorder.request('index', anonymous.get, '/rango/')
+        recorder.request('about', anonymous.get, '/rango/about/')
+        recorder.request('show_category', anonymous.get, '/rango/category/%s/' % random.choice(slugs))
+
+    user = Client()
+    for i in range(n_requests):
+        recorder.request('login', user.post, '/accounts/login/',
+                         {'username': 'benchmark', 'password': PASSWORD})
+    for i in range(n_requests):
+        recorder.request('add_category', user.post, '/rango/add_category/',
+                         {'name': 'Benchmark category %d' % i, 'views': 0, 'likes': 0})
+        recorder.request('add_page', user.post, '/rango/category/%s/add_page/' % random.choice(slugs),
+                         {'title': 'Benchmark page %d' % i, 'url': 'http://example.com/b%d' % i, 'views': 0})
+
+    for i in range(n_requests):
+        recorder.request('register', Client().post, '/accounts/register/',
+                         {'username': 'user%d' % i, 'email': 'user%d@example.com' % i,
+                          'password1': PASSWORD, 'password2': PASSWORD})
+    counters.flush()
+    return recorder.results()
+
+
+def load_test(n_threads, duration):
+    server, port = common.start_server(get_wsgi_application())
+    slugs = list(Category.objects.values_list('slug', flat=True)[:1000])
+    paths = ['/rango/', '/rango/about/'] + ['/rango/category/%s/' % slug for slug in slugs]
+
+    samples, errors = [], []
+    deadline = time.time() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', random.choice(paths))
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(str(e))
+                conn = http.client.HTTPConnection('127.0.0.1', port)
+                continue
+            samples.append(time.perf_counter() - start)
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    result = common.summarize('load', samples)
+    result.update({'threads': n_threads, 'errors': len(errors),
+                   'requests_per_second': round(len(samples) / float(duration), 1)})
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=settings.BASE_DIR).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per view.')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Load test length in seconds.')
+    parser.add_argument('--output', help='JSON results file, benchmarks/results/<commit>-<scale>.json by default.')
+    args = parser.parse_args()
+
+    # the test environment makes 'testserver' valid, the load test uses 127.0.0.1
+    common.setup_database()
+    settings.ALLOWED_HOSTS = ['*']
+    # the suite reports latency itself, and the registration and login
+    # requests would all be logged as over the latency budget
+    logging.getLogger('rango.performance').setLevel(logging.ERROR)
+    cache.clear()
+    caching.reset_stats()
+
+    commit = git_commit()
+    results = {'commit': commit, 'scale': args.scale, 'python': sys.version.split()[0],
+               'seed': seed(SCALES[args.scale])}
+    results['views'] = drive_views(args.requests)
+    results['load'] = load_test(args.threads, args.duration)
+    results['cache'] = caching.stats()
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         '%s-%s.json' % (commit, args.scale))
+    if not os.path.isdir(os.path.dirname(output)):
+        os.makedirs(os.path.dirname(output))
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    print('seeded {pages} pages at {rows_per_second} rows/sec'.format(**results['seed']))
+    over_budget = []
+    for name, row in sorted(results['views'].items()):
+        print('{name:<15} p50={p50_ms:>8.3f}ms p99={p99_ms:>8.3f}ms queries={max_queries}/{query_budget}'.format(
+            **row))
+        if row['max_queries'] > row['query_budget']:
+            over_budget.append(name)
+    print('load: {requests_per_second} req/s with {threads} threads, p50={p50_ms}ms p99={p99_ms}ms, '
+          '{errors} errors'.format(**results['load']))
+    print('results written to %s' % output)
+
+    if over_budget:
+        print('over the query budget: %s' % ', '.join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
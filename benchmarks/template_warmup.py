@@ -0,0 +1,65 @@
+"""Startup time against first-request latency, per template mode.
+
+    python benchmarks/template_warmup.py --categories 200 --requests 50
+
+Each mode runs in a new process: 'default' is the loaders of DEBUG mode
+(templates read and parsed on every render), 'production' sets
+RANGO_TEMPLATE_MODE=production (cached loader, templates precompiled in
+AppConfig.ready()). Reported: the time django.setup() takes, the latency
+of the first request, and the median latency after it. The response
+cache is cleared before each request, so every request renders.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def measure(n_categories, n_requests):
+    start = time.perf_counter()
+    import common
+    setup_seconds = time.perf_counter() - start
+
+    from django.core.cache import cache
+    from django.test import Client
+    from rango.models import Category
+
+    common.setup_database()
+    for i in range(n_categories):
+        Category.objects.create(name='Category %d' % i)
+    client = Client()
+    paths = ['/rango/', '/rango/about/'] + ['/rango/category/category-%d/' % i for i in range(n_categories)]
+    samples = []
+    for i in range(n_requests):
+        cache.clear()
+        start = time.perf_counter()
+        client.get(paths[i % len(paths)])
+        samples.append(time.perf_counter() - start)
+    return {'setup_ms': round(setup_seconds * 1000, 1), 'first_ms': round(samples[0] * 1000, 3),
+            'p50_ms': round(common.percentile(samples[1:], 50) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.categories, args.requests)))
+        return
+
+    for mode in ('default', 'production'):
+        env = dict(os.environ, RANGO_TEMPLATE_MODE=mode)
+        output = subprocess.check_output([sys.executable, __file__, '--measure', '--categories',
+                                          str(args.categories), '--requests', str(args.requests)], env=env)
+        result = json.loads(output.decode('utf-8').splitlines()[-1])
+        print('{0:<11} startup={setup_ms:>8.1f}ms  first request={first_ms:>8.3f}ms  '
+              'then p50={p50_ms:>8.3f}ms'.format(mode, **result))
+
+
+if __name__ == '__main__':
+    main()
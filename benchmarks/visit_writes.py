@@ -0,0 +1,69 @@
+"""Database writes per request caused by visit tracking.
+
+    python benchmarks/visit_writes.py --visitors 20 --requests 50
+
+Every visitor gets its own client (and session) and requests the index
+and about pages in turn. 'legacy' is the old visitor_cookie_handler,
+which assigned both session keys on every request.
+"""
+import argparse
+import time
+from datetime import datetime
+from unittest import mock
+
+import common
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rango import visits
+
+
+def legacy_track(request):
+    visits_count = int(request.session.get('visits', '1'))
+    last_visit = request.session.get('last_visit', str(datetime.now()))
+    last_visit_time = datetime.strptime(last_visit.split('.')[0], '%Y-%m-%d %H:%M:%S')
+    if (datetime.now() - last_visit_time).days > 0:
+        visits_count = visits_count + 1
+        request.session['last_visit'] = str(datetime.now())
+    else:
+        request.session['last_visit'] = last_visit
+    request.session['visits'] = visits_count
+    return visits_count
+
+
+def run(store, n_visitors, n_requests):
+    clients = [Client() for i in range(n_visitors)]
+    paths = ['/rango/', '/rango/about/']
+    with override_settings(RANGO_VISIT_STORE='session' if store == 'legacy' else store), \
+            mock.patch.object(visits, 'track', legacy_track if store == 'legacy' else visits.track), \
+            CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for i in range(n_requests):
+            for client in clients:
+                client.get(paths[i % 2])
+        elapsed = time.perf_counter() - start
+
+    total = n_visitors * n_requests
+    writes = [q for q in queries.captured_queries
+              if 'django_session' in q['sql'] and q['sql'].startswith(('UPDATE', 'INSERT'))]
+    reads = [q for q in queries.captured_queries
+             if 'django_session' in q['sql'] and q['sql'].startswith('SELECT')]
+    print('{0:<15} {1:>6} requests  {2:>6.3f} session writes/request  {3:>6.3f} reads/request  '
+          '{4:>7.3f} ms/request'.format(store, total, len(writes) / float(total),
+                                         len(reads) / float(total), elapsed * 1000 / total))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--visitors', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    common.setup_database()
+    for store in ('legacy', 'session', 'signed_cookie', 'cache'):
+        run(store, args.visitors, args.requests)
+
+
+if __name__ == '__main__':
+    main()
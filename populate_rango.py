@@ -1,10 +1,12 @@
 import os
+import sys
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tango_with_django_project.settings')
 
 import django
 django.setup()
 
-from rango.models import Category, Page
+from rango.bulk import BulkLoader, read_rows
+from rango.models import Page
 
 def populate():
     # First, we will create lists of dictionaries containing the pages
@@ -38,39 +40,33 @@ def populate():
         "Other Frameworks": {"pages": other_pages, "views": 32, "likes": 16}
     }
 
-    # The code below goes through the cats dictionary, then adds each category,
-    # and then adds all the associated pages for that category
+    # The code below goes through the cats dictionary and turns every page
+    # into one row, the bulk loader then adds (or updates) all the categories
+    # and pages with a handful of queries instead of a few per page
 
+    rows = []
     for cat, cat_data in cats.items():
         # updated script to show views and likes for categories
-        c = add_cat(cat, cat_data["views"], cat_data["likes"])
         for p in cat_data["pages"]:
-            add_page(c, p["title"], p["url"], p["views"])
+            rows.append({"category": cat, "category_views": cat_data["views"],
+                         "category_likes": cat_data["likes"],
+                         "title": p["title"], "url": p["url"], "views": p["views"]})
+    BulkLoader().load(rows)
 
     # Print out the categories we have added
+    # select_related() fetches each page's category in the same query
 
-    for c in Category.objects.all():
-        for p in Page.objects.filter(category=c):
-            print("- {0} - {1}".format(str(c), str(p)))
-
-def add_page(cat, title, url, views=0):
-    # avoids duplicates: below methods returns a tuple of (object, created)
-    # [0] gets only the object for the variable
-    p = Page.objects.get_or_create(category=cat, title=title)[0]
-    p.url = url
-    p.views = views
-    p.save()
-    return p
-
-def add_cat(name, views=0, likes=0):
-    c = Category.objects.get_or_create(name=name)[0]
-    c.views = views
-    c.likes = likes
-    c.save()
-    return c
+    for p in Page.objects.select_related('category').order_by('category__name', 'id'):
+        print("- {0} - {1}".format(str(p.category), str(p)))
 
 # Execute
 # if __main__: only executes if the module is run as a standalone Python script
+# Pass a CSV or JSON lines file to load it instead of the sample data,
+# see `python manage.py bulk_load --help` for the format
 if __name__ == '__main__':
     print("Starting Rango population script...")
-    populate()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        loader = BulkLoader().load(read_rows(sys.argv[1]))
+        print("Loaded {0} rows ({1:.0f} rows/sec)".format(loader.rows, loader.rows_per_second))
+    else:
+        populate()
\ No newline at end of file
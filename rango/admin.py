@@ -1,12 +1,164 @@
-from django.contrib import admin
-from rango.models import Category, Page, UserProfile
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.core.urlresolvers import reverse
+from django.db import connections, transaction
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from rango import api, caching, leaderboards, search
+from rango.canonical import canonical_hash
+from rango.models import Category, Page, PageLinkStatus, UserProfile
 
-class PageAdmin(admin.ModelAdmin):
+
+def estimated_count(model, using='default'):
+    # Row count from the database's statistics, without scanning the
+    # table. None when the database keeps none.
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute("SELECT table_rows FROM information_schema.tables "
+                           "WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        elif connection.vendor == 'sqlite':
+            # ANALYZE fills sqlite_stat1, failing that the largest rowid
+            # (an overestimate once rows are deleted) is read off the index
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            cursor.execute("SELECT MAX({0}) FROM {1}".format(
+                connection.ops.quote_name(model._meta.pk.column), connection.ops.quote_name(table)))
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    # An unfiltered changelist of a big table is counted from the
+    # database's statistics: COUNT(*) reads the whole table (or index).
+    # Up to RANGO_ADMIN_EXACT_COUNT_LIMIT rows, and whenever a filter or a
+    # search applies, the count is exact.
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > getattr(settings, 'RANGO_ADMIN_EXACT_COUNT_LIMIT', 10000):
+                return estimate
+        return queryset.count()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    # Changelists that stay fast with millions of rows: estimated counts,
+    # no second COUNT(*) for "N total", and searches that use an index
+    # (a case-sensitive prefix of prefix_search_field) instead of a
+    # LIKE '%term%' scan.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    prefix_search_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term or self.prefix_search_field is None:
+            return queryset, False
+        # prefix <= value < prefix + the highest character, a range scan
+        return queryset.filter(**{self.prefix_search_field + '__gte': term,
+                                  self.prefix_search_field + '__lt': term + u'\U0010ffff'}), False
+
+
+def invalidate(model):
+    # update() sends no post_save, invalidate what the signal
+    # receivers would have (see rango.signals)
+    if model is Category:
+        caching.bump_generation('categories')
+    caching.bump_generation('content')
+    api.bump_data_version()
+    leaderboards.boards[model].invalidate()
+
+
+def reset_views(modeladmin, request, queryset):
+    count = queryset.update(views=0)
+    invalidate(queryset.model)
+    modeladmin.message_user(request, 'Reset the views of %d %s.' % (
+        count, queryset.model._meta.verbose_name_plural))
+reset_views.short_description = 'Reset views of the selected %(verbose_name_plural)s'
+
+
+def move_to_category(modeladmin, request, queryset):
+    slug = request.POST.get('category', '').strip()
+    category = Category.objects.filter(slug=slug).first()
+    if category is None:
+        modeladmin.message_user(request, 'No category with the slug "%s".' % slug, level=messages.ERROR)
+        return
+    # "select all" can pick a lot of pages: one UPDATE, whose WHERE is the
+    # changelist's, rather than a list of ids, and the search index
+    # (which stores each page's category) follows from rango_page
+    with transaction.atomic():
+        count = queryset.update(category=category)
+        search.get_index().move_pages(category)
+    invalidate(Page)
+    modeladmin.message_user(request, 'Moved %d pages to %s.' % (count, category.name))
+move_to_category.short_description = 'Move the selected pages to a category'
+
+
+class PageActionForm(ActionForm):
+    category = forms.CharField(required=False, label='Category slug:')
+
+
+class PageAdmin(ScalableAdmin):
     list_display = ('title', 'category', 'url',)
+    # one JOIN instead of a query per row for the category
+    list_select_related = ('category',)
+    # the change form would otherwise list every category
+    raw_id_fields = ('category',)
+    prefix_search_field = 'title'
+    search_fields = ('title', 'url_host')
+    actions = [reset_views, move_to_category]
+    action_form = PageActionForm
+
+    def get_search_results(self, request, queryset, search_term):
+        # "http://example.com/a" finds the pages with that link,
+        # "example.com" the pages of a site, anything else is the
+        # start of a title
+        term = search_term.strip()
+        if '://' in term:
+            return queryset.filter(canonical_hash=canonical_hash(term)), False
+        if term and '.' in term and ' ' not in term:
+            return queryset.filter(url_host=term.lower()), False
+        return super(PageAdmin, self).get_search_results(request, queryset, search_term)
 
-class CategoryAdmin(admin.ModelAdmin):
+
+class CategoryAdmin(ScalableAdmin):
     prepopulated_fields = {'slug':('name',)}
+    list_display = ('name', 'views', 'likes', 'pages')
+    prefix_search_field = 'name'
+    search_fields = ('name',)
+    actions = [reset_views]
+
+    def pages(self, category):
+        # filtering by category this way is an index lookup, a list_filter
+        # would list every category on each changelist
+        url = reverse('admin:rango_page_changelist') + '?category__id__exact=%d' % category.pk
+        return format_html('<a href="{0}">pages</a>', url)
+
+
+class PageLinkStatusAdmin(ScalableAdmin):
+    list_display = ('page', 'status', 'error', 'latency_ms', 'checked')
+    list_select_related = ('page',)
+    raw_id_fields = ('page',)
+
 
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Page, PageAdmin)
-admin.site.register(UserProfile)
\ No newline at end of file
+admin.site.register(PageLinkStatus, PageLinkStatusAdmin)
+admin.site.register(UserProfile)
@@ -0,0 +1,104 @@
+import json
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from rango.models import Category, DataVersion, Page
+
+CATEGORY_FIELDS = ('id', 'name', 'slug', 'views', 'likes')
+PAGE_FIELDS = ('id', 'title', 'url', 'views')
+
+# bytes collected before a piece of the response is handed to the server
+BUFFER_SIZE = 16 * 1024
+
+
+def _bump():
+    if not DataVersion.objects.filter(pk='data').update(version=F('version') + 1):
+        DataVersion.objects.get_or_create(pk='data', defaults={'version': 1})
+
+
+def bump_data_version():
+    # Called on every write, including the view and like counts flushed
+    # by rango.counters, so the version covers everything the API returns.
+    # Inside a transaction the row is updated once, when it commits: a
+    # cascade delete or a bulk load is one UPDATE, and the row isn't
+    # locked for the rest of the transaction. A rollback drops the bump,
+    # along with the flag, which is the callback waiting in the queue.
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _bump()
+    elif not any(func is _bump for sids, func in connection.run_on_commit):
+        transaction.on_commit(_bump)
+
+
+def data_etag(name):
+    # The version is read from the database on every request: a cached
+    # counter is per process and starts again after a restart, and the
+    # same ETag for different data would get a client a wrong 304
+    version = DataVersion.objects.filter(pk='data').values_list('version', flat=True).first()
+    return '"%s-%s"' % (name, version or 0)
+
+
+def get_chunk_size():
+    return getattr(settings, 'RANGO_API_CHUNK_SIZE', 500)
+
+
+def buffered(parts):
+    # joins small strings into pieces of about BUFFER_SIZE
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _categories_json(chunk_size):
+    # Categories are read with a single iterator() query, and the pages of
+    # every chunk_size categories with one more, ordered by category so
+    # they can be merged in as they arrive. Nothing is held in memory
+    # but the current chunk of categories.
+    categories = Category.objects.order_by('id').values(*CATEGORY_FIELDS).iterator()
+    yield '['
+    first = True
+    while True:
+        chunk = list(islice(categories, chunk_size))
+        if not chunk:
+            break
+        pages = (Page.objects.filter(category_id__in=[category['id'] for category in chunk])
+                 .order_by('category_id', '-views', '-id').values('category_id', *PAGE_FIELDS).iterator())
+        pages = groupby(pages, itemgetter('category_id'))
+        category_id, category_pages = next(pages, (None, iter(())))
+        for category in chunk:
+            if not first:
+                yield ','
+            first = False
+            # the category object, left open for its pages
+            yield json.dumps(category)[:-1] + ', "pages": ['
+            if category['id'] == category_id:
+                for i, page in enumerate(category_pages):
+                    yield (',' if i else '') + json.dumps(dict((f, page[f]) for f in PAGE_FIELDS))
+                category_id, category_pages = next(pages, (None, iter(())))
+            yield ']}'
+    yield ']'
+
+
+def _pages_json():
+    pages = Page.objects.order_by('id').values('category_id', *PAGE_FIELDS).iterator()
+    yield '['
+    for i, page in enumerate(pages):
+        yield (',' if i else '') + json.dumps(page)
+    yield ']'
+
+
+def stream_categories(chunk_size=None):
+    return buffered(_categories_json(chunk_size or get_chunk_size()))
+
+
+def stream_pages():
+    return buffered(_pages_json())
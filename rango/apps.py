@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class RangoConfig(AppConfig):
     name = 'rango'
+
+    def ready(self):
+        # connect the signal receivers
+        import rango.signals
+
+        from django.conf import settings
+        if getattr(settings, 'RANGO_TEMPLATE_PRECOMPILE', False):
+            from rango import templating
+            templating.precompile()
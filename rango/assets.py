@@ -0,0 +1,131 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_tz, mktime_tz
+
+# ManifestStaticFilesStorage names (rango.3fa9c1d27b2e.jpg) and resized
+# profile pictures never change content, the rest may be replaced
+HASHED_NAME = re.compile(r'(\.[0-9a-f]{12}\.[^/.]+$)|(^profile_images/variants/)')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=3600'
+
+# precompressed variants written by the build_assets command, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+BLOCK_SIZE = 64 * 1024
+
+
+class AssetServer(object):
+    # WSGI middleware serving static and media files before Django sees the
+    # request: no URL resolving, no middleware. It picks a precompressed
+    # variant the client accepts, answers conditional and Range requests,
+    # and hands the file to the server's wsgi.file_wrapper, which lets
+    # servers such as gunicorn use sendfile().
+
+    def __init__(self, application, mounts):
+        self.application = application
+        # (url prefix, directory) pairs
+        self.mounts = [(prefix, os.path.abspath(root)) for prefix, root in mounts if prefix and root]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for prefix, root in self.mounts:
+            if path.startswith(prefix):
+                return self.serve(environ, start_response, root, path[len(prefix):])
+        return self.application(environ, start_response)
+
+    def serve(self, environ, start_response, root, name):
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.error(start_response, '405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+
+        path = os.path.abspath(os.path.join(root, name))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return self.error(start_response, '404 Not Found')
+
+        headers = [('Vary', 'Accept-Encoding')]
+        content_type, encoding = mimetypes.guess_type(path)
+        headers.append(('Content-Type', content_type or 'application/octet-stream'))
+        headers.append(('Cache-Control', IMMUTABLE if HASHED_NAME.search(name) else REVALIDATE))
+
+        ranged = 'HTTP_RANGE' in environ
+        if not ranged and encoding is None:
+            accepted = environ.get('HTTP_ACCEPT_ENCODING', '')
+            for encoding_name, suffix in ENCODINGS:
+                if encoding_name in accepted and os.path.isfile(path + suffix):
+                    path += suffix
+                    headers.append(('Content-Encoding', encoding_name))
+                    break
+
+        stat = os.stat(path)
+        etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+        headers.append(('ETag', etag))
+        headers.append(('Last-Modified', formatdate(stat.st_mtime, usegmt=True)))
+        if self.not_modified(environ, etag, stat.st_mtime):
+            start_response('304 Not Modified', headers)
+            return []
+
+        start, length, status = 0, stat.st_size, '200 OK'
+        headers.append(('Accept-Ranges', 'bytes'))
+        if ranged:
+            byte_range = self.parse_range(environ['HTTP_RANGE'], stat.st_size)
+            if byte_range is None:
+                return self.error(start_response, '416 Range Not Satisfiable',
+                                  [('Content-Range', 'bytes */%d' % stat.st_size)])
+            start, end = byte_range
+            length = end - start + 1
+            status = '206 Partial Content'
+            headers.append(('Content-Range', 'bytes %d-%d/%d' % (start, end, stat.st_size)))
+        headers.append(('Content-Length', str(length)))
+
+        start_response(status, headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        f = open(path, 'rb')
+        if start == 0 and length == stat.st_size and 'wsgi.file_wrapper' in environ:
+            return environ['wsgi.file_wrapper'](f, BLOCK_SIZE)
+        f.seek(start)
+        return self.read_range(f, length)
+
+    def not_modified(self, environ, etag, mtime):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return etag in if_none_match or if_none_match.strip() == '*'
+        if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            parsed = parsedate_tz(if_modified_since)
+            return parsed is not None and int(mtime) <= mktime_tz(parsed)
+        return False
+
+    def parse_range(self, header, size):
+        # only a single range is supported, which is what clients ask for
+        match = re.match(r'^bytes=(\d*)-(\d*)$', header.strip())
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '':
+            # the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        if start > end or start >= size:
+            return None
+        return start, end
+
+    def read_range(self, f, length):
+        try:
+            while length > 0:
+                data = f.read(min(BLOCK_SIZE, length))
+                if not data:
+                    break
+                length -= len(data)
+                yield data
+        finally:
+            f.close()
+
+    def error(self, start_response, status, headers=()):
+        body = status.encode('utf-8')
+        start_response(status, list(headers) + [('Content-Type', 'text/plain'),
+                                                ('Content-Length', str(len(body)))])
+        return [body]
@@ -0,0 +1,185 @@
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.db.models import Case, When, Value, F
+from django.template.defaultfilters import slugify
+from rango import api, caching, leaderboards, search, slugs
+from rango.canonical import canonical_hash
+from rango.models import Category, Page, url_host
+
+# sqlite allows 999 parameters per statement, keep IN (...) lists
+# and CASE expressions well below that
+MAX_PARAMS = 400
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_rows(path, fmt=None):
+    # Stream rows from a CSV file (with a header line) or a JSON lines file,
+    # one object per line. Both use the keys category, title, url, views
+    # and optionally category_views and category_likes.
+    fmt = fmt or ('csv' if path.endswith('.csv') else 'json')
+    with open(path) as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _int(value, default=0):
+    if value in (None, ''):
+        return default
+    return int(value)
+
+
+def _case(model, name, values):
+    # CASE WHEN id = 1 THEN ... WHEN id = 2 THEN ... ELSE <column> END
+    whens = [When(pk=pk, then=Value(value)) for pk, value in values.items()]
+    return Case(*whens, default=F(name), output_field=model._meta.get_field(name))
+
+
+class BulkLoader(object):
+    # Upserts categories and pages in batches: each batch costs a couple
+    # of SELECTs to find the existing rows, bulk INSERTs for new rows
+    # and one CASE ... WHEN UPDATE per chunk of changed rows.
+    # Categories are matched by name and pages by (category, title),
+    # like populate_rango did with get_or_create().
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.category_ids = {}
+        self.rows = 0
+        self.categories_created = 0
+        self.pages_created = 0
+        self.pages_updated = 0
+        self.created_slugs = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def load(self, rows):
+        start = time.time()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.load_batch(batch)
+                batch = []
+        if batch:
+            self.load_batch(batch)
+        self.elapsed = time.time() - start
+        self.finish()
+        return self
+
+    def load_batch(self, rows):
+        with transaction.atomic():
+            category_ids = self._load_categories(rows)
+            page_ids = self._load_pages(rows)
+            # bulk_create() and update() don't send post_save either, the
+            # rows of the batch are indexed with it
+            index = search.get_index()
+            for ids in chunks(category_ids, MAX_PARAMS):
+                index.reindex(category_ids=ids)
+            for ids in chunks(page_ids, MAX_PARAMS):
+                index.reindex(page_ids=ids)
+        self.rows += len(rows)
+
+    def finish(self):
+        # bulk_create() and update() don't send post_save,
+        # so invalidate what the signal receivers would have
+        caching.bump_generation('categories')
+        caching.bump_generation('content')
+        api.bump_data_version()
+        for board in leaderboards.boards.values():
+            board.invalidate()
+        # the slugs of new categories may be cached as not found
+        for names in chunks(self.created_slugs, MAX_PARAMS):
+            slugs.resolver.invalidate(*names)
+
+    def _load_categories(self, rows):
+        # returns the ids of the categories created, the only ones whose
+        # name (what search indexes) was written
+        wanted = {}
+        for row in rows:
+            counts = wanted.setdefault(row['category'], {})
+            if row.get('category_views') not in (None, ''):
+                counts['views'] = _int(row['category_views'])
+            if row.get('category_likes') not in (None, ''):
+                counts['likes'] = _int(row['category_likes'])
+
+        unknown = [name for name in wanted if name not in self.category_ids]
+        for names in chunks(unknown, MAX_PARAMS):
+            self.category_ids.update(Category.objects.filter(name__in=names).values_list('name', 'id'))
+
+        new = [name for name in unknown if name not in self.category_ids]
+        if new:
+            Category.objects.bulk_create(
+                Category(name=name, slug=slugify(name),
+                         views=wanted[name].get('views', 0), likes=wanted[name].get('likes', 0))
+                for name in new
+            )
+            for names in chunks(new, MAX_PARAMS):
+                self.category_ids.update(Category.objects.filter(name__in=names).values_list('name', 'id'))
+            self.categories_created += len(new)
+            self.created_slugs.extend(slugify(name) for name in new)
+
+        for field in ('views', 'likes'):
+            values = {self.category_ids[name]: counts[field]
+                      for name, counts in wanted.items() if field in counts and name not in new}
+            for ids in chunks(values, MAX_PARAMS // 2):
+                Category.objects.filter(pk__in=ids).update(
+                    **{field: _case(Category, field, {pk: values[pk] for pk in ids})})
+        return [self.category_ids[name] for name in new]
+
+    def _load_pages(self, rows):
+        # returns the ids of the pages created or updated
+        wanted = {}
+        for row in rows:
+            key = (self.category_ids[row['category']], row['title'])
+            wanted[key] = {'url': row['url'], 'views': _int(row.get('views'))}
+
+        existing = {}
+        for keys in chunks(wanted, MAX_PARAMS // 2):
+            queryset = Page.objects.filter(category_id__in=set(key[0] for key in keys),
+                                           title__in=set(key[1] for key in keys))
+            for pk, category_id, title in queryset.values_list('id', 'category_id', 'title'):
+                if (category_id, title) in wanted:
+                    existing[(category_id, title)] = pk
+
+        new = [key for key in wanted if key not in existing]
+        Page.objects.bulk_create(
+            Page(category_id=key[0], title=key[1], url=wanted[key]['url'], views=wanted[key]['views'],
+                 url_host=url_host(wanted[key]['url']), canonical_hash=canonical_hash(wanted[key]['url']))
+            for key in new
+        )
+        self.pages_created += len(new)
+        created = []
+        for keys in chunks(new, MAX_PARAMS // 2):
+            queryset = Page.objects.filter(category_id__in=set(key[0] for key in keys),
+                                           title__in=set(key[1] for key in keys))
+            keys = set(keys)
+            created.extend(pk for pk, category_id, title in queryset.values_list('id', 'category_id', 'title')
+                           if (category_id, title) in keys)
+
+        updates = {pk: wanted[key] for key, pk in existing.items()}
+        for ids in chunks(updates, MAX_PARAMS // 8):
+            Page.objects.filter(pk__in=ids).update(
+                url=_case(Page, 'url', {pk: updates[pk]['url'] for pk in ids}),
+                url_host=_case(Page, 'url_host', {pk: url_host(updates[pk]['url']) for pk in ids}),
+                canonical_hash=_case(Page, 'canonical_hash', {pk: canonical_hash(updates[pk]['url']) for pk in ids}),
+                views=_case(Page, 'views', {pk: updates[pk]['views'] for pk in ids}),
+            )
+        self.pages_updated += len(updates)
+        return created + list(updates)
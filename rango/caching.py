@@ -0,0 +1,57 @@
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+
+# Cached values are keyed by a generation counter per namespace:
+# bumping the generation makes every old key unreachable at once,
+# so we never have to know which keys are currently stored.
+GENERATION_KEY = 'rango:generation:%s'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_generation(namespace):
+    generation = cache.get(GENERATION_KEY % namespace)
+    if generation is None:
+        # add() only succeeds if no other process set it in the meantime
+        cache.add(GENERATION_KEY % namespace, 1, None)
+        generation = cache.get(GENERATION_KEY % namespace, 1)
+    return generation
+
+
+def bump_generation(namespace):
+    try:
+        return cache.incr(GENERATION_KEY % namespace)
+    except ValueError:
+        # the key was never set (or has been evicted)
+        cache.add(GENERATION_KEY % namespace, 2, None)
+        return cache.get(GENERATION_KEY % namespace, 2)
+
+
+def versioned_key(namespace, *parts):
+    key = ['rango', namespace, str(get_generation(namespace))]
+    key.extend(str(part) for part in parts)
+    return ':'.join(key)
+
+
+# hit/miss counters, per process
+def record_hit(name):
+    with _stats_lock:
+        _stats[name + '_hits'] += 1
+
+
+def record_miss(name):
+    with _stats_lock:
+        _stats[name + '_misses'] += 1
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,75 @@
+import hashlib
+import posixpath
+import re
+import string
+
+from django.utils.six.moves.urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+# query parameters that only track where a click came from
+TRACKING_PARAMS = ('fbclid', 'gclid', 'mc_cid', 'mc_eid')
+TRACKING_PREFIXES = ('utm_',)
+
+# characters left as they are in a path, everything else is percent-encoded
+PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+# characters that mean the same encoded or not (RFC 3986, section 2.3);
+# any other escape, like %2F, is a different path than the character
+UNRESERVED = frozenset(string.ascii_letters + string.digits + '-._~')
+
+ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+# a '%' that doesn't start an escape
+STRAY_PERCENT = re.compile(r'%(?![0-9A-Fa-f]{2})')
+
+# a port is only the default one for its own scheme: http://a.com:443/
+# is a different server than http://a.com/
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _normalize_escape(match):
+    char = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else '%' + match.group(1).upper()
+
+
+def canonical_url(url):
+    # The form two urls of the same page have in common: http and https,
+    # letter case and default port of the host, a "www." prefix, a
+    # trailing slash, dot segments, percent-encoding of unreserved
+    # characters and the case of escapes, parameter order, tracking
+    # parameters and the fragment don't count. The user info does.
+    #   canonical_url('HTTPS://www.Example.com:443/a/./b/?y=2&x=1#top')
+    #   -> 'http://example.com/a/b?x=1&y=2'
+    url = (url or '').strip()
+    if '://' not in url:
+        url = 'http://' + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    if ':' in host:
+        # IPv6 address
+        host = '[{0}]'.format(host)
+    if port and port != DEFAULT_PORTS.get(parts.scheme):
+        host = '{0}:{1}'.format(host, port)
+    if '@' in parts.netloc:
+        host = '{0}@{1}'.format(parts.netloc.rpartition('@')[0], host)
+
+    # normpath drops dot segments and the trailing slash, but keeps '//'
+    path = ESCAPE.sub(_normalize_escape, STRAY_PERCENT.sub('%25', parts.path))
+    path = posixpath.normpath(path or '/')
+    if path.startswith('//'):
+        path = '/' + path.lstrip('/')
+    path = quote(path, safe=PATH_SAFE + '%')
+
+    params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+              if key not in TRACKING_PARAMS and not key.startswith(TRACKING_PREFIXES)]
+    scheme = 'http' if parts.scheme in ('http', 'https') else parts.scheme
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ''))
+
+
+def canonical_hash(url):
+    # what Page.canonical_hash stores: duplicates share it
+    return hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()
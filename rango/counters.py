@@ -0,0 +1,141 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# sent after a flush with the increments that were written,
+# as a dict of {(model, field): {pk: delta}}
+counters_flushed = Signal(providing_args=['deltas'])
+
+# sent with the same increments inside the flush's transaction, for
+# writes that must commit, or roll back and be retried, with the counters
+counters_flushing = Signal(providing_args=['deltas'])
+
+
+class CounterBuffer(object):
+    # Increments are coalesced in memory and written in bulk as
+    # UPDATE ... SET field = field + delta statements, so concurrent
+    # hits never overwrite each other and a burst of views on the same
+    # row costs a single write.
+
+    def __init__(self, flush_interval=5.0, flush_threshold=1000):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def increment(self, model, field, pk, delta=1):
+        with self._lock:
+            self._pending[(model, field)][pk] += delta
+            self._size += 1
+            size = self._size
+        if self.flush_interval:
+            self._ensure_thread()
+            if size >= self.flush_threshold:
+                # let the background thread do the write
+                self._wakeup.set()
+        elif size >= self.flush_threshold:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return {key: dict(deltas) for key, deltas in self._pending.items()}
+
+    def flush(self):
+        with self._lock:
+            pending = {key: dict(deltas) for key, deltas in self._pending.items()}
+            self._pending.clear()
+            self._size = 0
+        if not pending:
+            return 0
+
+        with self._flush_lock:
+            updated = 0
+            try:
+                with transaction.atomic():
+                    for (model, field), deltas in pending.items():
+                        # one UPDATE per distinct delta rather than per row
+                        by_delta = defaultdict(list)
+                        for pk, delta in deltas.items():
+                            by_delta[delta].append(pk)
+                        for delta, pks in by_delta.items():
+                            updated += model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+                    counters_flushing.send(sender=self.__class__, deltas=pending)
+            except Exception:
+                # nothing was written, add the increments back to those
+                # made since so the next flush writes them all
+                with self._lock:
+                    for key, deltas in pending.items():
+                        for pk, delta in deltas.items():
+                            self._pending[key][pk] += delta
+                            self._size += 1
+                raise
+        counters_flushed.send(sender=self.__class__, deltas=pending)
+        return updated
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rango-counters')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush view counters')
+            finally:
+                # the thread keeps its own connection, don't leak it
+                from django.db import connection
+                connection.close()
+
+
+buffer = CounterBuffer(
+    flush_interval=getattr(settings, 'RANGO_COUNTER_FLUSH_INTERVAL', 5.0),
+    flush_threshold=getattr(settings, 'RANGO_COUNTER_FLUSH_THRESHOLD', 1000),
+)
+
+
+@atexit.register
+def flush_at_exit():
+    # write whatever is left when the process exits
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception('Failed to flush view counters at exit')
+
+
+def record_page_view(page_id):
+    from rango.models import Page
+    buffer.increment(Page, 'views', page_id)
+
+
+def record_category_view(category_id):
+    from rango.models import Category
+    buffer.increment(Category, 'views', category_id)
+
+
+def record_category_like(category_id):
+    from rango.models import Category
+    buffer.increment(Category, 'likes', category_id)
+
+
+def flush():
+    return buffer.flush()
@@ -0,0 +1,48 @@
+from django.db.models import Count
+from rango.bulk import MAX_PARAMS, _case, chunks
+from rango.canonical import canonical_hash
+from rango.models import Page
+
+
+def find_duplicate(url):
+    # A page with the same canonical url, or None: one lookup
+    # on the canonical_hash index
+    pages = Page.objects.filter(canonical_hash=canonical_hash(url)).select_related('category')
+    return next(iter(pages[:1]), None)
+
+
+def backfill(batch_size=1000):
+    # Sets canonical_hash where it is missing or out of date, batch_size
+    # pages at a time in id order (an index seek, so memory and the cost
+    # of a batch don't grow with the table). Returns the number of pages
+    # read and the number updated.
+    scanned = updated = last_id = 0
+    while True:
+        rows = list(Page.objects.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'url', 'canonical_hash')[:batch_size])
+        if not rows:
+            return scanned, updated
+        last_id = rows[-1][0]
+        scanned += len(rows)
+        stale = {}
+        for pk, url, current in rows:
+            value = canonical_hash(url)
+            if value != current:
+                stale[pk] = value
+        for ids in chunks(stale, MAX_PARAMS // 2):
+            updated += Page.objects.filter(pk__in=ids).update(
+                canonical_hash=_case(Page, 'canonical_hash', dict((pk, stale[pk]) for pk in ids)))
+
+
+def clusters(min_size=2):
+    # (canonical_hash, number of pages) of the urls added more than once,
+    # largest first. The GROUP BY reads the canonical_hash index and the
+    # rows are streamed, not loaded at once.
+    return (Page.objects.exclude(canonical_hash='').values_list('canonical_hash')
+            .annotate(size=Count('id')).filter(size__gte=min_size)
+            .order_by('-size', 'canonical_hash').iterator())
+
+
+def cluster_pages(value, limit=None):
+    pages = Page.objects.filter(canonical_hash=value).select_related('category').order_by('id')
+    return pages[:limit] if limit else pages
@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.models import User
+from rango.duplicates import find_duplicate
 from rango.models import Page, Category, UserProfile
 
 class CategoryForm(forms.ModelForm):
@@ -30,16 +31,24 @@ class PageForm(forms.ModelForm):
 
     def clean(self):
         # form data is obtained from the ModelForm dictionary attribute cleaned_data
-        cleaned_data = self.cleaned_data
+        cleaned_data = super(PageForm, self).clean()
         url = cleaned_data.get('url')
 
-        # If url is not empty and doesn't start with 'http://',
+        # If url is not empty and has no scheme,
         # then prepend 'http://'
-        if url and not url.startswith('http://'):
+        if url and '://' not in url:
             url = 'http://' + url
             cleaned_data['url'] = url
 
-            return cleaned_data
+        # the same link with another scheme, a trailing slash, its
+        # parameters in another order... is refused (see rango.canonical)
+        if url:
+            duplicate = find_duplicate(url)
+            if duplicate is not None:
+                self.add_error('url', 'This page was already added to {0} as "{1}".'.format(
+                    duplicate.category.name, duplicate.title))
+
+        return cleaned_data
 
 
 class UserForm(forms.ModelForm):
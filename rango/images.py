@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'profile_images/variants'
+
+# file extension per Pillow format
+FORMATS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()[:16]
+
+
+def variant_name(digest, size, fmt='JPEG'):
+    # the name changes with the content, so the file can be cached forever
+    return '%s/%s-%d.%s' % (VARIANT_DIR, digest, size, FORMATS[fmt])
+
+
+def image_formats():
+    from PIL import features
+    return [fmt for fmt in FORMATS if fmt != 'WEBP' or features.check('webp')]
+
+
+def build_variants(source_path, media_root, sizes, formats, digest=None):
+    # Runs in a worker process: resizes the original to every size and
+    # format, skipping variants that already exist. Returns the digest.
+    from PIL import Image
+
+    digest = digest or file_digest(source_path)
+    os.makedirs(os.path.join(media_root, VARIANT_DIR), exist_ok=True)
+    with Image.open(source_path) as original:
+        original = original.convert('RGB')
+        for size in sizes:
+            thumbnail = None
+            for fmt in formats:
+                path = os.path.join(media_root, variant_name(digest, size, fmt))
+                if os.path.exists(path):
+                    continue
+                if thumbnail is None:
+                    thumbnail = original.copy()
+                    thumbnail.thumbnail((size, size), Image.LANCZOS)
+                # write to a temporary name so a half written file is never served
+                tmp_path = '%s.%d.tmp' % (path, os.getpid())
+                thumbnail.save(tmp_path, fmt, quality=85)
+                os.rename(tmp_path, path)
+    return digest
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=getattr(settings, 'RANGO_IMAGE_WORKERS', 2))
+    return _pool
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error('Failed to build profile image variants', exc_info=future.exception())
+
+
+def process_profile(profile):
+    # Called after a profile is saved: records the digest of the picture
+    # and queues the resizing, which happens outside the request
+    from rango.models import UserProfile
+
+    if not profile.picture:
+        return None
+    digest = file_digest(profile.picture.path)
+    if digest != profile.picture_hash:
+        profile.picture_hash = digest
+        UserProfile.objects.filter(pk=profile.pk).update(picture_hash=digest)
+
+    args = (profile.picture.path, settings.MEDIA_ROOT, get_sizes(), image_formats(), digest)
+    if not getattr(settings, 'RANGO_IMAGE_WORKERS', 2):
+        # no pool, e.g. in tests
+        build_variants(*args)
+        return None
+    future = get_pool().submit(build_variants, *args)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def get_sizes():
+    return getattr(settings, 'RANGO_PROFILE_IMAGE_SIZES', (64, 128, 256))
+
+
+def variant_url(profile, size, fmt='JPEG'):
+    # the url of the smallest variant at least `size` pixels wide,
+    # or of the original until the variants have been built
+    if not profile.picture:
+        return ''
+    if profile.picture_hash:
+        sizes = sorted(s for s in get_sizes() if s >= size) or [max(get_sizes())]
+        name = variant_name(profile.picture_hash, sizes[0], fmt)
+        if default_storage.exists(name):
+            return default_storage.url(name)
+    return profile.picture.url
@@ -0,0 +1,275 @@
+import bisect
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.dispatch import Signal
+from rango import caching, templating
+
+logger = logging.getLogger('rango.performance')
+
+# sent after every measured request, with the view name and a dict of
+# {'duration', 'sql_count', 'sql_time', 'template_time', 'session_time'}
+request_measured = Signal(providing_args=['view_name', 'measurements'])
+
+# histogram bucket upper bounds, in seconds for the times (1-2-5 steps
+# from 100us to 60s) and as plain numbers for the query counts
+TIME_BUCKETS = [m * 10 ** e for e in range(-4, 2) for m in (1, 2, 5)]
+COUNT_BUCKETS = [0, 1, 2, 3, 4, 5, 7, 10, 15, 20, 30, 50, 75, 100, 200, 500, 1000]
+
+METRICS = (
+    ('duration', 'rango_request_duration_seconds', 'Time spent in the request.', TIME_BUCKETS),
+    ('sql_count', 'rango_request_sql_queries', 'SQL queries per request.', COUNT_BUCKETS),
+    ('sql_time', 'rango_request_sql_duration_seconds', 'Time spent in SQL per request.', TIME_BUCKETS),
+    ('template_time', 'rango_request_template_duration_seconds', 'Time spent rendering templates.',
+     TIME_BUCKETS),
+    ('session_time', 'rango_request_session_duration_seconds', 'Time spent reading/writing the session.',
+     TIME_BUCKETS),
+)
+
+_state = threading.local()
+
+
+class RollingHistogram(object):
+    # Counts observations in fixed buckets, split in time slices so that
+    # quantiles cover only the last `window` seconds. Memory is fixed:
+    # one list of counters per slice, whatever the traffic.
+
+    def __init__(self, buckets, window=60, slices=6):
+        self.buckets = buckets
+        self.slice_seconds = float(window) / slices
+        self._slices = [[0] * (len(buckets) + 1) for i in range(slices)]
+        self._slice_ids = [None] * slices
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self, now):
+        slice_id = int(now // self.slice_seconds)
+        index = slice_id % len(self._slices)
+        if self._slice_ids[index] != slice_id:
+            # this slice is older than the window, reuse it
+            self._slices[index] = [0] * (len(self.buckets) + 1)
+            self._slice_ids[index] = slice_id
+        return self._slices[index]
+
+    def observe(self, value, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._current(now)[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q, now=None):
+        # the upper bound of the bucket holding the q-th observation
+        now = time.time() if now is None else now
+        oldest = int(now // self.slice_seconds) - len(self._slices) + 1
+        with self._lock:
+            totals = [0] * (len(self.buckets) + 1)
+            for slice_id, counts in zip(self._slice_ids, self._slices):
+                if slice_id is not None and slice_id >= oldest:
+                    totals = [a + b for a, b in zip(totals, counts)]
+        seen, rank = 0, q * sum(totals)
+        if not rank:
+            return 0.0
+        for index, count in enumerate(totals):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+
+class Registry(object):
+    # one histogram per (view, metric)
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, view_name, metric):
+        key = (view_name, metric)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    buckets = dict((m[0], m[3]) for m in METRICS)[metric]
+                    histogram = RollingHistogram(buckets, getattr(settings, 'RANGO_METRICS_WINDOW', 60))
+                    self._histograms[key] = histogram
+        return histogram
+
+    def record(self, view_name, measurements):
+        for metric, value in measurements.items():
+            self.histogram(view_name, metric).observe(value)
+
+    def view_names(self):
+        with self._lock:
+            return sorted(set(view_name for view_name, metric in self._histograms))
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+def prometheus_text():
+    lines = []
+    view_names = registry.view_names()
+    for metric, name, help_text, buckets in METRICS:
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s summary' % name)
+        for view_name in view_names:
+            histogram = registry.histogram(view_name, metric)
+            for q in (0.5, 0.95, 0.99):
+                lines.append('%s{view="%s",quantile="%s"} %s' % (name, view_name, q, histogram.quantile(q)))
+            lines.append('%s_sum{view="%s"} %s' % (name, view_name, histogram.sum))
+            lines.append('%s_count{view="%s"} %d' % (name, view_name, histogram.count))
+
+    lines.append('# HELP rango_cache_requests_total Cache lookups by cache and result.')
+    lines.append('# TYPE rango_cache_requests_total counter')
+    for key, value in sorted(caching.stats().items()):
+        cache_name, result = key.rsplit('_', 1)
+        lines.append('rango_cache_requests_total{cache="%s",result="%s"} %d' % (cache_name, result, value))
+
+    lines.append('# HELP rango_template_warmup_seconds Time spent precompiling templates at startup.')
+    lines.append('# TYPE rango_template_warmup_seconds gauge')
+    lines.append('rango_template_warmup_seconds{templates="%d"} %s' % (templating.warmup['templates'],
+                                                                       templating.warmup['seconds']))
+    return '\n'.join(lines) + '\n'
+
+
+def add_template_time(seconds):
+    measurements = getattr(_state, 'measurements', None)
+    if measurements is not None:
+        measurements['template_time'] += seconds
+
+
+def add_query(seconds):
+    measurements = getattr(_state, 'measurements', None)
+    if measurements is not None:
+        measurements['sql_count'] += 1
+        measurements['sql_time'] += seconds
+
+
+def add_session_time(seconds):
+    measurements = getattr(_state, 'measurements', None)
+    if measurements is not None:
+        measurements['session_time'] += seconds
+
+
+def install_query_hook():
+    # Time every query, the way connection.execute_wrapper() (Django 2.0)
+    # would: the SQL isn't kept, unlike with the debug cursor. The debug
+    # cursor's execute() calls this one, so queries are counted with
+    # DEBUG on too.
+    from django.db.backends.utils import CursorWrapper
+
+    if getattr(CursorWrapper.execute, 'rango_timed', False):
+        return
+
+    def timed(method):
+        def wrapper(self, *args, **kwargs):
+            if getattr(_state, 'measurements', None) is None:
+                return method(self, *args, **kwargs)
+            start = time.time()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                add_query(time.time() - start)
+        wrapper.rango_timed = True
+        return wrapper
+
+    CursorWrapper.execute = timed(CursorWrapper.execute)
+    CursorWrapper.executemany = timed(CursorWrapper.executemany)
+
+
+def install_session_hook():
+    # time the session engine's reads and writes, wherever it keeps
+    # sessions (a cache-backed engine runs no SQL for most of them)
+    from importlib import import_module
+
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if getattr(store.load, 'rango_timed', False):
+        return
+
+    def timed(method):
+        def wrapper(self, *args, **kwargs):
+            # save() may call create() which calls save(), count it once
+            if getattr(_state, 'in_session', False):
+                return method(self, *args, **kwargs)
+            _state.in_session = True
+            start = time.time()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                _state.in_session = False
+                add_session_time(time.time() - start)
+        wrapper.rango_timed = True
+        return wrapper
+
+    for name in ('load', 'save', 'create', 'delete', 'exists'):
+        setattr(store, name, timed(getattr(store, name)))
+
+
+def install_template_hook():
+    # time every Django template render (nested renders such as inclusion
+    # tags are part of their parent's time, so only the outermost counts)
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'rango_timed', False):
+        return
+    render = Template.render
+
+    def timed_render(self, *args, **kwargs):
+        if getattr(_state, 'rendering', False):
+            return render(self, *args, **kwargs)
+        _state.rendering = True
+        start = time.time()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            _state.rendering = False
+            add_template_time(time.time() - start)
+
+    timed_render.rango_timed = True
+    Template.render = timed_render
+
+
+class InstrumentationMiddleware(object):
+    # Measures each request and records it per view name; requests over
+    # RANGO_QUERY_BUDGET queries or RANGO_LATENCY_BUDGET_MS are logged.
+    # Put it first, so that it sees the queries of the other middleware.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_hook()
+        install_query_hook()
+        install_session_hook()
+
+    def __call__(self, request):
+        measurements = {'template_time': 0.0, 'sql_count': 0, 'sql_time': 0.0, 'session_time': 0.0}
+        _state.measurements = measurements
+        start = time.time()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.time() - start
+            _state.measurements = None
+        measurements['duration'] = duration
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or 'unresolved'
+        registry.record(view_name, measurements)
+        request_measured.send(sender=self.__class__, view_name=view_name, measurements=measurements)
+
+        query_budget = getattr(settings, 'RANGO_QUERY_BUDGET', 20)
+        latency_budget = getattr(settings, 'RANGO_LATENCY_BUDGET_MS', 500)
+        if measurements['sql_count'] > query_budget or duration * 1000 > latency_budget:
+            logger.warning('%s %s (%s) over budget: %.1fms, %d queries (%.1fms SQL, %.1fms templates)',
+                           request.method, request.path, view_name, duration * 1000,
+                           measurements['sql_count'], measurements['sql_time'] * 1000,
+                           measurements['template_time'] * 1000)
+        return response
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.core.cache import cache
+from rango import caching
+from rango.models import Category, Page
+
+
+class Leaderboard(object):
+    # A materialized top-N list kept in the cache.
+    # It is rebuilt with a single indexed ORDER BY ... LIMIT query when
+    # missing, and patched in place when scores go up. Anything that can
+    # push an entry down (a lower score, a deletion) drops the list so it
+    # is rebuilt on the next read. The timeout bounds how stale a list
+    # can get when another process changed the scores. Scores are read
+    # from the primary, as a replica may not have the write yet.
+
+    def __init__(self, name, model, score_field, fields):
+        self.name = name
+        self.model = model
+        self.score_field = score_field
+        self.fields = fields
+        self.key = 'rango:leaderboard:%s' % name
+
+    @property
+    def size(self):
+        return getattr(settings, 'RANGO_LEADERBOARD_SIZE', 5)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'RANGO_LEADERBOARD_TIMEOUT', 300)
+
+    def top(self):
+        entries = cache.get(self.key)
+        if entries is None:
+            caching.record_miss('leaderboard')
+            return self.rebuild()
+        caching.record_hit('leaderboard')
+        return entries
+
+    def rebuild(self):
+        queryset = self.model.objects.using('default').order_by('-' + self.score_field, 'id')
+        entries = list(queryset.values(*self.fields)[:self.size])
+        cache.set(self.key, entries, self.timeout)
+        return entries
+
+    def invalidate(self):
+        cache.delete(self.key)
+        # the index page shows the leaderboards
+        caching.bump_generation('content')
+
+    def update(self, rows):
+        # rows are dicts with (at least) the leaderboard fields and fresh scores
+        entries = cache.get(self.key)
+        if entries is None:
+            return
+
+        merged = {entry['id']: entry for entry in entries}
+        changed = False
+        for row in rows:
+            current = merged.get(row['id'])
+            if current is not None and row[self.score_field] < current[self.score_field]:
+                # something outside the list may now rank higher
+                self.invalidate()
+                return
+            if current != row:
+                merged[row['id']] = row
+                changed = True
+        if not changed:
+            return
+
+        ordered = sorted(merged.values(), key=lambda entry: (-entry[self.score_field], entry['id']))
+        ordered = ordered[:self.size]
+        if ordered != entries:
+            cache.set(self.key, ordered, self.timeout)
+            caching.bump_generation('content')
+
+    def update_ids(self, ids):
+        # re-read the scores of rows whose counters were just flushed
+        if cache.get(self.key) is None:
+            return
+        self.update(self.model.objects.using('default').filter(id__in=list(ids)).values(*self.fields))
+
+    def update_instance(self, instance):
+        self.update([{field: getattr(instance, field) for field in self.fields}])
+
+    def remove(self, pk):
+        entries = cache.get(self.key)
+        if entries is not None and any(entry['id'] == pk for entry in entries):
+            self.invalidate()
+
+
+boards = {
+    Category: Leaderboard('categories', Category, 'likes', ('id', 'name', 'slug', 'likes')),
+    Page: Leaderboard('pages', Page, 'views', ('id', 'title', 'url', 'views')),
+}
+
+
+def top_categories():
+    return boards[Category].top()
+
+
+def top_pages():
+    return boards[Page].top()
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rango import caching
+from rango.bulk import MAX_PARAMS, chunks
+from rango.models import Page, PageLinkStatus, url_host
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'rango-link-checker/1.0'
+
+# answers some servers give to HEAD when a GET would work
+HEAD_REFUSED = (400, 403, 405, 501)
+
+
+class LinkChecker(object):
+    # Checks urls concurrently on one asyncio event loop. At most
+    # `concurrency` connections are open, `per_host` of them to any one
+    # host, and requests to a host start at least `delay` seconds apart.
+    # Each url gets a HEAD, then a GET if the server refuses HEAD, with
+    # the ETag and Last-Modified of the previous check so that an
+    # unchanged page answers 304 Not Modified.
+
+    def __init__(self, concurrency=None, per_host=None, delay=None, timeout=None):
+        if aiohttp is None:
+            raise ImproperlyConfigured('The link checker needs aiohttp: pip install aiohttp')
+        self.concurrency = concurrency or getattr(settings, 'RANGO_LINK_CHECK_CONCURRENCY', 100)
+        self.per_host = per_host or getattr(settings, 'RANGO_LINK_CHECK_PER_HOST', 2)
+        self.delay = getattr(settings, 'RANGO_LINK_CHECK_DELAY', 0.5) if delay is None else delay
+        self.timeout = timeout or getattr(settings, 'RANGO_LINK_CHECK_TIMEOUT', 10.0)
+        self._next_start = {}
+
+    def check(self, links):
+        # links are (page_id, url, etag, last_modified) tuples, returns
+        # an unsaved PageLinkStatus for each
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self._check_all(links))
+        finally:
+            loop.close()
+
+    async def _check_all(self, links):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            return await asyncio.gather(*[self._check(session, *link) for link in links])
+
+    async def _wait_turn(self, host):
+        # the event loop runs one coroutine at a time, so reserving the
+        # next start time for the host needs no lock
+        now = time.monotonic()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _request(self, session, method, url, headers):
+        await self._wait_turn(url_host(url))
+        start = time.perf_counter()
+        # leaving the block without reading the body closes the response
+        async with session.request(method, url, headers=headers, allow_redirects=True) as response:
+            return response, (time.perf_counter() - start) * 1000
+
+    async def _check(self, session, page_id, url, etag='', last_modified=''):
+        result = PageLinkStatus(page_id=page_id, etag=etag or '', last_modified=last_modified or '')
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        try:
+            response, result.latency_ms = await self._request(session, 'HEAD', url, headers)
+            if response.status in HEAD_REFUSED:
+                response, result.latency_ms = await self._request(session, 'GET', url, headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            result.error = (str(e) or e.__class__.__name__)[:255]
+        else:
+            result.status = response.status
+            if response.status != 304:
+                result.etag = response.headers.get('ETag', '')[:255]
+                result.last_modified = response.headers.get('Last-Modified', '')[:64]
+        result.dead = result.status is None or result.status >= 400
+        result.checked = timezone.now()
+        return result
+
+
+def due_links(limit, now=None, after=0):
+    # Pages never checked, or not for RANGO_LINK_CHECK_INTERVAL seconds,
+    # with an id above `after`, as (page_id, url, etag, last_modified, dead)
+    # tuples
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'RANGO_LINK_CHECK_INTERVAL', 86400))
+    rows = (Page.objects.filter(Q(link_status__isnull=True) | Q(link_status__checked__lt=cutoff), id__gt=after)
+            .order_by('id')
+            .values_list('id', 'url', 'link_status__etag', 'link_status__last_modified', 'link_status__dead'))
+    return list(rows[:limit])
+
+
+def save_results(results):
+    # replaces the previous statuses, a DELETE and an INSERT per chunk
+    with transaction.atomic():
+        for chunk in chunks(results, MAX_PARAMS):
+            ids = [result.page_id for result in chunk]
+            # pages deleted while they were being checked
+            existing = set(Page.objects.filter(pk__in=ids).values_list('id', flat=True))
+            PageLinkStatus.objects.filter(page_id__in=ids).delete()
+            PageLinkStatus.objects.bulk_create(result for result in chunk if result.page_id in existing)
+
+
+def check_due(limit=None, batch_size=1000, checker=None, now=None):
+    # Checks the links that are due, batch_size at a time, and returns
+    # the number checked and the number found dead.
+    checker = checker or LinkChecker()
+    checked = dead = last_id = 0
+    flipped = False
+    while limit is None or checked < limit:
+        # each batch starts after the last, so a run checks a link once
+        links = due_links(batch_size if limit is None else min(batch_size, limit - checked), now, last_id)
+        if not links:
+            break
+        last_id = links[-1][0]
+        results = checker.check([link[:4] for link in links])
+        save_results(results)
+        checked += len(results)
+        dead += sum(1 for result in results if result.dead)
+        flipped = flipped or any(bool(link[4]) != result.dead for link, result in zip(links, results))
+    if flipped:
+        # category pages flag dead links
+        caching.bump_generation('content')
+    logger.info('Checked %d links, %d dead', checked, dead)
+    return checked, dead
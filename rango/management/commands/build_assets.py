@@ -0,0 +1,59 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# files that are worth compressing, images are compressed already
+COMPRESSIBLE = ('.css', '.js', '.html', '.svg', '.txt', '.json', '.xml', '.map', '.ico')
+
+
+class Command(BaseCommand):
+    help = ('Collect static files under content-hashed names (when RANGO_ASSET_MODE is on) '
+            'and write .gz and .br variants next to them for rango.assets.AssetServer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-collect', action='store_true',
+                            help="Only compress, don't run collectstatic first.")
+
+    def handle(self, *args, **options):
+        if not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+        written = 0
+        for root in (settings.STATIC_ROOT, settings.MEDIA_ROOT):
+            if not root or not os.path.isdir(root):
+                continue
+            for directory, dirs, files in os.walk(root):
+                for name in files:
+                    if name.endswith(COMPRESSIBLE):
+                        written += self.compress(os.path.join(directory, name))
+
+        if brotli is None:
+            self.stdout.write('brotli is not installed, only gzip variants were written')
+        self.stdout.write('Wrote {0} compressed files'.format(written))
+
+    def compress(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        written = 0
+        variants = [('.gz', lambda data: gzip.compress(data, 9))]
+        if brotli is not None:
+            variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        for suffix, compress in variants:
+            target = path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            compressed = compress(data)
+            # not worth it when it barely gets smaller
+            if len(compressed) < len(data) * 0.95:
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+        return written
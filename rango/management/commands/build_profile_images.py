@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rango import images
+from rango.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Build the resized variants of every profile picture, in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes, one per CPU by default.')
+
+    def handle(self, *args, **options):
+        start = time.time()
+        sizes, formats = images.get_sizes(), images.image_formats()
+        profiles = UserProfile.objects.exclude(picture='').values_list('id', 'picture', 'picture_hash')
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {}
+            for pk, picture, picture_hash in profiles.iterator():
+                path = UserProfile._meta.get_field('picture').storage.path(picture)
+                future = pool.submit(images.build_variants, path, settings.MEDIA_ROOT, sizes, formats)
+                futures[future] = (pk, picture_hash)
+
+            for future in as_completed(futures):
+                pk, picture_hash = futures[future]
+                try:
+                    digest = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write('Profile {0}: {1}'.format(pk, e))
+                    continue
+                if digest != picture_hash:
+                    UserProfile.objects.filter(pk=pk).update(picture_hash=digest)
+                done += 1
+
+        self.stdout.write('Built variants for {0} profiles ({1} failed) in {2:.2f}s'.format(
+            done, failed, time.time() - start))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from rango.bulk import BulkLoader, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Load categories and pages from a CSV or JSON lines file. '
+            'Existing categories (by name) and pages (by category and title) are updated.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'json'),
+                            help='Input format, guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows written per transaction.')
+
+    def handle(self, *args, **options):
+        loader = BulkLoader(batch_size=options['batch_size'])
+        loader.load(read_rows(options['path'], options['format']))
+        self.stdout.write(
+            'Loaded {0} rows in {1:.2f}s ({2:.0f} rows/sec): '
+            '{3} categories created, {4} pages created, {5} pages updated'.format(
+                loader.rows, loader.elapsed, loader.rows_per_second,
+                loader.categories_created, loader.pages_created, loader.pages_updated))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rango import links
+
+
+class Command(BaseCommand):
+    help = 'Check the urls of pages concurrently and record which are dead, once or every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Check at most this many links per run.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Links checked and saved at a time.')
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Connections open at once (RANGO_LINK_CHECK_CONCURRENCY by default).')
+        parser.add_argument('--per-host', type=int, default=None,
+                            help='Connections open to one host (RANGO_LINK_CHECK_PER_HOST by default).')
+        parser.add_argument('--delay', type=float, default=None,
+                            help='Seconds between requests to one host (RANGO_LINK_CHECK_DELAY by default).')
+        parser.add_argument('--loop', action='store_true', help='Keep checking, as a background process.')
+        parser.add_argument('--interval', type=float, default=3600.0, help='Seconds between runs with --loop.')
+
+    def handle(self, *args, **options):
+        checker = links.LinkChecker(concurrency=options['concurrency'], per_host=options['per_host'],
+                                    delay=options['delay'])
+        while True:
+            start = time.time()
+            checked, dead = links.check_due(options['limit'], options['batch_size'], checker)
+            self.stdout.write('Checked {0} links in {1:.2f}s, {2} dead'.format(checked, time.time() - start, dead))
+            if not options['loop']:
+                return
+            # don't hold a connection while sleeping
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rango import duplicates
+
+
+class Command(BaseCommand):
+    help = ('Set the canonical url hash of pages that lack one (run it after migrating), '
+            'then list the urls added more than once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Pages read per query in the backfill.')
+        parser.add_argument('--no-backfill', action='store_false', dest='backfill',
+                            help='Only report, the hashes are up to date.')
+        parser.add_argument('--min-size', type=int, default=2, help='Smallest cluster of duplicates reported.')
+        parser.add_argument('--clusters', type=int, default=20,
+                            help='Clusters listed with their pages, largest first (0 for all).')
+        parser.add_argument('--pages', type=int, default=10, help='Pages listed per cluster (0 for all).')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            start = time.time()
+            scanned, updated = duplicates.backfill(options['batch_size'])
+            self.stdout.write('Read {0} pages in {1:.2f}s, updated {2} hashes'.format(
+                scanned, time.time() - start, updated))
+
+        n_clusters = n_pages = 0
+        for value, size in duplicates.clusters(options['min_size']):
+            n_clusters += 1
+            n_pages += size
+            if options['clusters'] and n_clusters > options['clusters']:
+                continue
+            self.stdout.write('{0} pages share {1}:'.format(size, value))
+            for page in duplicates.cluster_pages(value, options['pages']):
+                self.stdout.write('  #{0} {1} ({2}) {3}'.format(page.id, page.title, page.category.name, page.url))
+        self.stdout.write('{0} urls are duplicated, by {1} pages'.format(n_clusters, n_pages))
@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rango import search
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the full text search index from the pages and categories, after loading rows '
+            'some other way than the models and rango.bulk.')
+
+    def handle(self, *args, **options):
+        start = time.time()
+        search.get_index().rebuild()
+        self.stdout.write('Rebuilt the search index in {0:.2f}s'.format(time.time() - start))
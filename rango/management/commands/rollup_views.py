@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rango import trending
+
+
+class Command(BaseCommand):
+    help = ('Roll the per minute page view buckets up into hourly and daily totals, prune old totals '
+            'and rank the trending pages, once or every --interval seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep rolling up, as a background process.')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between rollups with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.time()
+            rolled = trending.rollup()
+            self.stdout.write('Rolled up {0} view buckets in {1:.2f}s'.format(rolled, time.time() - start))
+            if not options['loop']:
+                return
+            # don't hold a connection while sleeping
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rango import sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in small chunks, once or every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows deleted per statement (RANGO_SESSION_SWEEP_CHUNK by default).')
+        parser.add_argument('--pause', type=float, default=None,
+                            help='Seconds to sleep between chunks (RANGO_SESSION_SWEEP_PAUSE by default).')
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping, as a background process.')
+        parser.add_argument('--interval', type=float, default=3600.0, help='Seconds between sweeps with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.time()
+            deleted = sessions.sweep_expired(options['chunk_size'], options['pause'])
+            self.stdout.write('Deleted {0} expired sessions in {1:.2f}s'.format(deleted, time.time() - start))
+            if not options['loop']:
+                return
+            # don't hold a connection while sleeping
+            connection.close()
+            time.sleep(options['interval'])
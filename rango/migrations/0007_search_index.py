@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # only sqlite builds with FTS5 get the table, other databases
+    # fall back to the in-memory index in rango.search
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE rango_search USING fts5("
+                "title, url, category, kind UNINDEXED, obj_id UNINDEXED, "
+                "category_id UNINDEXED, slug UNINDEXED, prefix='2 3')")
+        except Exception:
+            # this sqlite was built without FTS5
+            return
+        cursor.execute(
+            "INSERT INTO rango_search (rowid, title, url, category, kind, obj_id, category_id, slug) "
+            "SELECT p.id * 2, p.title, p.url, c.name, 'page', p.id, c.id, c.slug "
+            "FROM rango_page p JOIN rango_category c ON c.id = p.category_id")
+        cursor.execute(
+            "INSERT INTO rango_search (rowid, title, url, category, kind, obj_id, category_id, slug) "
+            "SELECT c.id * 2 + 1, c.name, '', c.name, 'category', c.id, c.id, c.slug "
+            "FROM rango_category c")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS rango_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rango', '0006_auto_20261017_2253'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 23:26
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.utils.six.moves.urllib.parse import urlsplit
+
+BATCH = 2000
+# rows per UPDATE, two parameters each, below sqlite's 999
+CHUNK = 200
+
+
+# Copies of rango.models.url_host and rango.bulk._case as they were when
+# this migration was written: migrations must not change with the code
+
+
+def url_host(url):
+    try:
+        return (urlsplit(url or '').hostname or '')[:255]
+    except ValueError:
+        return ''
+
+
+def case(model, name, values):
+    whens = [When(pk=pk, then=Value(value)) for pk, value in values.items()]
+    return Case(*whens, default=F(name), output_field=model._meta.get_field(name))
+
+
+def fill_url_host(apps, schema_editor):
+    # a batch of rows at a time, by primary key, so that big tables
+    # are neither loaded at once nor locked for long
+    Page = apps.get_model('rango', 'Page')
+    last = 0
+    while True:
+        rows = list(Page.objects.filter(pk__gt=last).order_by('pk').values_list('pk', 'url')[:BATCH])
+        if not rows:
+            return
+        for start in range(0, len(rows), CHUNK):
+            hosts = dict((pk, url_host(url)) for pk, url in rows[start:start + CHUNK])
+            Page.objects.filter(pk__in=hosts).update(url_host=case(Page, 'url_host', hosts))
+        last = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rango', '0009_userprofile_picture_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='url_host',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='page',
+            name='title',
+            field=models.CharField(db_index=True, max_length=128),
+        ),
+        migrations.RunPython(fill_url_host, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 23:28
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rango', '0010_page_url_host'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageLinkStatus',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='link_status', serialize=False, to='rango.Page')),
+                ('status', models.IntegerField(null=True)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('latency_ms', models.FloatField(null=True)),
+                ('checked', models.DateTimeField(db_index=True)),
+                ('dead', models.BooleanField(default=False)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+            ],
+            options={
+                'verbose_name_plural': 'Page link statuses',
+            },
+        ),
+    ]
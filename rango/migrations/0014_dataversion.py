@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 23:45
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    apps.get_model('rango', 'DataVersion').objects.create(name='data', version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rango', '0013_page_view_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # 0005 was generated under Python 2 with upload_to=b'profile_images',
+    # which makemigrations reports as a change under Python 3. The
+    # database is not touched.
+
+    dependencies = [
+        ('rango', '0014_dataversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='picture',
+            field=models.ImageField(blank=True, upload_to='profile_images'),
+        ),
+    ]
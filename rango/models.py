@@ -1,6 +1,16 @@
 from django.db import models
+from django.utils.six.moves.urllib.parse import urlsplit
 from django.template.defaultfilters import slugify
 from django.contrib.auth.models import User
+from rango.canonical import canonical_hash
+
+
+def url_host(url):
+    # 'http://Example.com:8000/a' -> 'example.com', '' when there is none
+    try:
+        return (urlsplit(url or '').hostname or '')[:255]
+    except ValueError:
+        return ''
 
 # all models have a default id field that acts as a primary key
 
@@ -8,7 +18,8 @@ class Category(models.Model):
     # store character data
     name = models.CharField(max_length=128, unique=True)
     views = models.IntegerField(default=0)
-    likes = models.IntegerField(default=0)
+    # indexed for the most liked leaderboard
+    likes = models.IntegerField(default=0, db_index=True)
     slug = models.SlugField(unique=True)
 
     def save(self, *args, **kwargs):
@@ -27,14 +38,108 @@ class Page(models.Model):
     # store category, title, url for the page
     # Page has a one-to-many relationships with model Category
     category = models.ForeignKey(Category)
-    title = models.CharField(max_length=128)
+    # indexed for the admin's prefix search
+    title = models.CharField(max_length=128, db_index=True)
     url = models.URLField()
-    views = models.IntegerField(default=0)
+    # indexed for the most viewed leaderboard
+    views = models.IntegerField(default=0, db_index=True)
+    # host part of url, lower case, so the admin can search pages by site
+    url_host = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    # hash of the canonical form of url (see rango.canonical), pages
+    # with the same link share it
+    canonical_hash = models.CharField(max_length=40, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        # a category's pages are listed by views (then id) a page at a time,
+        # this index answers those queries without sorting
+        indexes = [
+            models.Index(fields=['category', 'views', 'id'], name='rango_page_category_views'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.url_host = url_host(self.url)
+        self.canonical_hash = canonical_hash(self.url)
+        super(Page, self).save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
 
+class DataVersion(models.Model):
+    # Version of what the JSON API serves, moved on by every write (see
+    # rango.api). It is the API's ETag, so it is kept in the database,
+    # where every process sees the same one, before and after a restart.
+    name = models.CharField(max_length=32, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.name, self.version)
+
+
+class PageLinkStatus(models.Model):
+    # result of the last check of a page's url by rango.links
+    page = models.OneToOneField(Page, primary_key=True, related_name='link_status')
+    # HTTP status, None when there was no response (see error)
+    status = models.IntegerField(null=True)
+    error = models.CharField(max_length=255, blank=True)
+    latency_ms = models.FloatField(null=True)
+    # indexed to find the links due for a check
+    checked = models.DateTimeField(db_index=True)
+    dead = models.BooleanField(default=False)
+    # validators sent back on the next check, to get a 304
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Page link statuses'
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.page_id, self.status or self.error)
+
+
+class PageViewBucket(models.Model):
+    # Views of a page in one minute, appended by each counter flush (so
+    # a minute can have a row per flush). rango.trending rolls them up
+    # into PageViewHourly and PageViewDaily and deletes them. There is no
+    # foreign key constraint: nothing is checked on the way in, and the
+    # views of a deleted page just drop out of the joins.
+    page = models.ForeignKey(Page, db_constraint=False, related_name='+')
+    minute = models.DateTimeField(db_index=True)
+    views = models.IntegerField()
+
+
+class PageViewHourly(models.Model):
+    page = models.ForeignKey(Page, related_name='+')
+    hour = models.DateTimeField()
+    views = models.IntegerField(default=0)
+
+    class Meta:
+        # a window is a range of hours, read in index order
+        unique_together = ('hour', 'page')
+
+
+class PageViewDaily(models.Model):
+    page = models.ForeignKey(Page, related_name='+')
+    day = models.DateField()
+    views = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'page')
+
+
+class TrendingPage(models.Model):
+    # The most viewed pages of each window ('hour', 'day', 'week'), ranked
+    # by rango.trending when it rolls up, so reading them costs the same
+    # whatever the traffic
+    window = models.CharField(max_length=8)
+    rank = models.IntegerField()
+    page = models.ForeignKey(Page, related_name='+')
+    views = models.IntegerField()
+
+    class Meta:
+        unique_together = ('window', 'rank')
+
+
 class UserProfile(models.Model):
     # links UserProfile to a User model instance
     user = models.OneToOneField(User)
@@ -42,6 +147,8 @@ class UserProfile(models.Model):
     # additional attributes we wish to include (on top of Django's pre-initialised ones)
     website = models.URLField(blank=True)
     picture = models.ImageField(upload_to='profile_images', blank=True)
+    # digest of the picture, used in the names of its resized variants
+    picture_hash = models.CharField(max_length=16, blank=True, editable=False)
 
     def __str__(self):
         return self.user.username
@@ -0,0 +1,151 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# verifications queued or running, across all threads of the process
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+# hasher instances per PASSWORD_HASHERS list, in each worker process
+_hashers = {}
+
+
+def load_hashers(paths):
+    # The worker gets the hasher list with every call rather than reading
+    # PASSWORD_HASHERS itself, so it follows the settings of the caller
+    paths = tuple(paths)
+    if paths not in _hashers:
+        _hashers[paths] = [import_string(path)() for path in paths]
+    return _hashers[paths]
+
+
+def verify(password, encoded, hasher_paths):
+    # Runs in a worker process. Returns (valid, must_update): must_update
+    # is set when the hash was made with another hasher or work factor
+    # than the preferred (first) one, so it should be rehashed.
+    hashers = load_hashers(hasher_paths)
+    algorithm = (encoded or '').split('$', 1)[0]
+    hasher = next((h for h in hashers if h.algorithm == algorithm), None)
+    if hasher is None or not password:
+        return False, False
+    if not hasher.verify(password, encoded):
+        return False, False
+    preferred = hashers[0]
+    return True, hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def encode(password, hasher_paths):
+    # Runs in a worker process: hashes with the preferred hasher
+    preferred = load_hashers(hasher_paths)[0]
+    return preferred.encode(password, preferred.salt())
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=getattr(settings, 'RANGO_PASSWORD_WORKERS', 2))
+    return _pool
+
+
+def _acquire():
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= getattr(settings, 'RANGO_PASSWORD_QUEUE_LIMIT', 8):
+            return False
+        _in_flight += 1
+        return True
+
+
+def _release():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+def run(request, func, *args):
+    # Runs func in the pool (or inline when RANGO_PASSWORD_WORKERS is 0).
+    # When too many hashes are already waiting, or the result takes longer
+    # than RANGO_PASSWORD_TIMEOUT, the login is refused straight away
+    # rather than holding the thread: the request is marked so that
+    # PasswordPoolMiddleware answers 503.
+    if not _acquire():
+        overloaded(request)
+    args = args + (settings.PASSWORD_HASHERS,)
+    if not getattr(settings, 'RANGO_PASSWORD_WORKERS', 2):
+        try:
+            return func(*args)
+        finally:
+            _release()
+    try:
+        future = get_pool().submit(func, *args)
+    except Exception:
+        _release()
+        raise
+    # the slot is held until the job is over, not until we stop waiting
+    # for it: a hash that timed out still keeps a worker busy
+    future.add_done_callback(lambda future: _release())
+    try:
+        return future.result(timeout=getattr(settings, 'RANGO_PASSWORD_TIMEOUT', 5))
+    except TimeoutError:
+        # only a job that hasn't started yet can be cancelled
+        future.cancel()
+        overloaded(request)
+
+
+def overloaded(request):
+    if request is not None:
+        request._rango_password_pool_full = True
+    raise PermissionDenied('Too many logins in progress')
+
+
+class PooledPasswordBackend(ModelBackend):
+    # ModelBackend, with the password hashing done in a process pool:
+    # a burst of logins no longer blocks the threads serving pages.
+    # Hashes made with an older hasher or work factor are replaced with
+    # the preferred one when the user logs in, as User.check_password does.
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash anyway, so a missing user takes as long as a wrong password
+            run(request, encode, password or '')
+            return None
+
+        valid, must_update = run(request, verify, password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = run(request, encode, password)
+            UserModel._default_manager.filter(pk=user.pk).update(password=user.password)
+        return user
+
+
+class PasswordPoolMiddleware(object):
+    # Turns a login refused because the password pool is full into a
+    # 503 with Retry-After, instead of an "incorrect password" form
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, '_rango_password_pool_full', False):
+            response = HttpResponse('Too many logins in progress, please try again.', status=503,
+                                    content_type='text/plain')
+            response['Retry-After'] = '1'
+        return response
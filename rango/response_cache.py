@@ -0,0 +1,109 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.encoding import force_bytes, force_text
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from rango import caching, routers
+
+OVERLAY_MARKER = '<!--rango:overlay:%s-->'
+
+_overlays = {}
+
+
+class Overlay(object):
+    # A per user value in an otherwise shared page.
+    # While a page is rendered for the cache the overlay outputs a marker,
+    # which is replaced with the real value every time the page is served.
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+        self.marker = OVERLAY_MARKER % name
+
+    def __call__(self, request):
+        if getattr(request, '_rango_capturing', False):
+            return mark_safe(self.marker)
+        return self.func(request)
+
+
+def overlay(name):
+    def decorator(func):
+        _overlays[name] = Overlay(name, func)
+        return _overlays[name]
+    return decorator
+
+
+def _hash(*parts):
+    return hashlib.md5(b'\0'.join(force_bytes(part) for part in parts)).hexdigest()
+
+
+def cache_response(view=None, query_params=()):
+    # Caches the rendered page of a GET request, one copy for anonymous
+    # users and one for authenticated users, and fills in the overlays on
+    # the way out. The ETag covers the overlay values, so a conditional
+    # GET gets a 304 only when the page the user would see is unchanged.
+    # Every Category/Page write bumps the 'content' generation.
+    # The key is the path and the query_params the view reads, so other
+    # query strings (?x=1, ?x=2, ...) share a copy instead of each adding
+    # one: @cache_response(query_params=('after',))
+    if view is None:
+        return lambda view: cache_response(view, query_params)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        variant = 'auth' if request.user.is_authenticated else 'anon'
+        params = [request.GET.get(name, '') for name in query_params]
+        key = caching.versioned_key('content', 'response', view.__name__, variant,
+                                    _hash(request.path, *params))
+        entry = cache.get(key)
+        if entry is None:
+            caching.record_miss('response')
+            request._rango_capturing = True
+            try:
+                # the copy is kept until the next write, a replica may
+                # not have the last one yet
+                with routers.primary_reads():
+                    response = view(request, *args, **kwargs)
+            finally:
+                request._rango_capturing = False
+            if response.streaming or response.status_code != 200:
+                return response
+
+            content = force_text(response.content)
+            entry = {
+                'content': content,
+                'content_type': response['Content-Type'],
+                'overlays': [name for name, item in _overlays.items() if item.marker in content],
+                'etag': _hash(content),
+            }
+            cache.set(key, entry, getattr(settings, 'RANGO_RESPONSE_CACHE_TIMEOUT', 60))
+        else:
+            caching.record_hit('response')
+
+        # the overlays run on every request, even for a 304
+        content = entry['content']
+        values = []
+        for name in entry['overlays']:
+            value = force_text(conditional_escape(_overlays[name].func(request)))
+            content = content.replace(_overlays[name].marker, value)
+            values.append(value)
+        etag = '"%s"' % _hash(entry['etag'], *values)
+
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=entry['content_type'])
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Cookie',))
+        # the page depends on the session, shared caches must not keep it
+        patch_cache_control(response, private=True, max_age=0)
+        return response
+    return wrapper
@@ -0,0 +1,294 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from rango.models import Category, Page
+
+TABLE = 'rango_search'
+
+# pages get even rowids and categories odd ones
+PAGE, CATEGORY = 'page', 'category'
+
+# relative weight of a match in the title, url and category columns
+WEIGHTS = (10.0, 2.0, 5.0)
+
+INSERT_PAGES_SQL = (
+    "INSERT INTO {0} (rowid, title, url, category, kind, obj_id, category_id, slug) "
+    "SELECT p.id * 2, p.title, p.url, c.name, 'page', p.id, c.id, c.slug "
+    "FROM rango_page p JOIN rango_category c ON c.id = p.category_id".format(TABLE))
+INSERT_CATEGORIES_SQL = (
+    "INSERT INTO {0} (rowid, title, url, category, kind, obj_id, category_id, slug) "
+    "SELECT c.id * 2 + 1, c.name, '', c.name, 'category', c.id, c.id, c.slug "
+    "FROM rango_category c".format(TABLE))
+
+REBUILD_SQL = [
+    "DELETE FROM {0}".format(TABLE),
+    INSERT_PAGES_SQL,
+    INSERT_CATEGORIES_SQL,
+]
+
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def page_document(page, category=None):
+    category = category or page.category
+    return {'kind': PAGE, 'id': page.id, 'title': page.title, 'url': page.url,
+            'category': category.name, 'category_id': category.id, 'slug': category.slug}
+
+
+def category_document(category):
+    return {'kind': CATEGORY, 'id': category.id, 'title': category.name, 'url': '',
+            'category': category.name, 'category_id': category.id, 'slug': category.slug}
+
+
+class FTS5Index(object):
+    # Inverted index kept by sqlite itself in the rango_search table,
+    # created by migration 0007 when the sqlite build has FTS5.
+    # Its raw SQL runs on the 'default' connection, reads included:
+    # RANGO_READ_REPLICAS don't apply to search.
+
+    def _rowid(self, kind, pk):
+        return pk * 2 + (1 if kind == CATEGORY else 0)
+
+    def _write(self, doc):
+        rowid = self._rowid(doc['kind'], doc['id'])
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM {0} WHERE rowid = %s".format(TABLE), [rowid])
+            cursor.execute(
+                "INSERT INTO {0} (rowid, title, url, category, kind, obj_id, category_id, slug) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)".format(TABLE),
+                [rowid, doc['title'], doc['url'], doc['category'], doc['kind'], doc['id'],
+                 doc['category_id'], doc['slug']])
+
+    def index_page(self, page):
+        self._write(page_document(page))
+
+    def index_category(self, category):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT category, slug FROM {0} WHERE rowid = %s".format(TABLE),
+                           [self._rowid(CATEGORY, category.id)])
+            previous = cursor.fetchone()
+        self._write(category_document(category))
+        if previous is not None and previous != (category.name, category.slug):
+            # a rename has to be copied to the category's pages
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE {0} SET category = %s, slug = %s "
+                    "WHERE rowid IN (SELECT id * 2 FROM rango_page WHERE category_id = %s)".format(TABLE),
+                    [category.name, category.slug, category.id])
+
+    def move_pages(self, category):
+        # pages moved to the category by an UPDATE of rango_page, found
+        # by their category_id there, however many there are
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE {0} SET category = %s, category_id = %s, slug = %s "
+                "WHERE rowid IN (SELECT id * 2 FROM rango_page WHERE category_id = %s) "
+                "AND category_id != %s".format(TABLE),
+                [category.name, category.id, category.slug, category.id, category.id])
+
+    def remove(self, kind, pk):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM {0} WHERE rowid = %s".format(TABLE), [self._rowid(kind, pk)])
+
+    def reindex(self, page_ids=(), category_ids=()):
+        # Rows written without signals (see rango.bulk), a DELETE and an
+        # INSERT ... SELECT per kind, so the cost is that of the rows
+        # given. The ids must fit in one statement's parameters.
+        with connection.cursor() as cursor:
+            for kind, ids, sql, alias in ((PAGE, page_ids, INSERT_PAGES_SQL, 'p'),
+                                          (CATEGORY, category_ids, INSERT_CATEGORIES_SQL, 'c')):
+                if not ids:
+                    continue
+                params = ', '.join(['%s'] * len(ids))
+                cursor.execute("DELETE FROM {0} WHERE rowid IN ({1})".format(TABLE, params),
+                               [self._rowid(kind, pk) for pk in ids])
+                cursor.execute("{0} WHERE {1}.id IN ({2})".format(sql, alias, params), list(ids))
+
+    def rebuild(self):
+        # the whole table, for `manage.py rebuild_search_index`: searches
+        # see the old index until the new one is committed
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in REBUILD_SQL:
+                cursor.execute(sql)
+
+    def search(self, query, offset=0, limit=10):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # every term must match, the last one may be a prefix of a word
+        match = ' '.join('"%s"' % term for term in terms[:-1])
+        match += ' "%s"*' % terms[-1]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT kind, obj_id, title, url, category, category_id, slug FROM {0} "
+                "WHERE {0} MATCH %s ORDER BY bm25({0}, %s, %s, %s) LIMIT %s OFFSET %s".format(TABLE),
+                [match.strip()] + list(WEIGHTS) + [limit, offset])
+            columns = ('kind', 'id', 'title', 'url', 'category', 'category_id', 'slug')
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+class MemoryIndex(object):
+    # Pure Python inverted index for databases without FTS5.
+    # It is built from the database on first use and kept in memory,
+    # ranked by the weighted tf-idf of the matched terms, normalized by
+    # document length so that short exact matches come first.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = None
+        self._lengths = {}
+        self._postings = defaultdict(dict)
+        # the tokens of _postings in order, last terms are prefixes
+        self._tokens = []
+
+    def _ensure_built(self):
+        if self._docs is None:
+            self.rebuild()
+
+    def rebuild(self):
+        with self._lock:
+            self._docs = {}
+            self._lengths = {}
+            self._postings = defaultdict(dict)
+            # sorted once at the end rather than kept sorted meanwhile
+            self._tokens = None
+            categories = {}
+            for category in Category.objects.all():
+                categories[category.id] = category
+                self._add(category_document(category))
+            for page in Page.objects.all().iterator():
+                self._add(page_document(page, categories[page.category_id]))
+            self._tokens = sorted(self._postings)
+
+    def _add(self, doc):
+        key = (doc['kind'], doc['id'])
+        self._remove(key)
+        self._docs[key] = doc
+        length = 0
+        for weight, field in zip(WEIGHTS, ('title', 'url', 'category')):
+            for token in tokenize(doc[field]):
+                if self._tokens is not None and token not in self._postings:
+                    bisect.insort(self._tokens, token)
+                postings = self._postings[token]
+                postings[key] = postings.get(key, 0) + weight
+                length += 1
+        self._lengths[key] = length
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        del self._lengths[key]
+        for field in ('title', 'url', 'category'):
+            for token in tokenize(doc[field]):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[token]
+                        if self._tokens is not None:
+                            del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+    def index_page(self, page):
+        with self._lock:
+            if self._docs is not None:
+                self._add(page_document(page))
+
+    def index_category(self, category):
+        with self._lock:
+            if self._docs is None:
+                return
+            self._add(category_document(category))
+            for key, doc in list(self._docs.items()):
+                if doc['kind'] == PAGE and doc['category_id'] == category.id and \
+                        (doc['category'], doc['slug']) != (category.name, category.slug):
+                    self._add(dict(doc, category=category.name, slug=category.slug))
+
+    def move_pages(self, category):
+        with self._lock:
+            if self._docs is None:
+                return
+            for pk in Page.objects.filter(category=category).values_list('pk', flat=True).iterator():
+                doc = self._docs.get((PAGE, pk))
+                if doc is not None and doc['category_id'] != category.id:
+                    self._add(dict(doc, category=category.name, category_id=category.id, slug=category.slug))
+
+    def reindex(self, page_ids=(), category_ids=()):
+        with self._lock:
+            if self._docs is None:
+                return
+            for category in Category.objects.filter(pk__in=category_ids):
+                self._add(category_document(category))
+            for page in Page.objects.filter(pk__in=page_ids).select_related('category'):
+                self._add(page_document(page))
+
+    def remove(self, kind, pk):
+        with self._lock:
+            if self._docs is not None:
+                self._remove((kind, pk))
+
+    def _prefixed(self, prefix):
+        start = bisect.bisect_left(self._tokens, prefix)
+        end = start
+        while end < len(self._tokens) and self._tokens[end].startswith(prefix):
+            end += 1
+        return self._tokens[start:end]
+
+    def search(self, query, offset=0, limit=10):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._ensure_built()
+            scores = None
+            for position, term in enumerate(terms):
+                if position == len(terms) - 1:
+                    tokens = self._prefixed(term)
+                else:
+                    tokens = [term] if term in self._postings else []
+                matches = {}
+                for token in tokens:
+                    postings = self._postings[token]
+                    idf = math.log(1.0 + len(self._docs) / float(len(postings)))
+                    for key, weight in postings.items():
+                        matches[key] = matches.get(key, 0.0) + weight * idf
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {key: score + matches[key] for key, score in scores.items() if key in matches}
+            for key in scores:
+                scores[key] /= math.sqrt(self._lengths[key] or 1)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            return [self._docs[key] for key, score in ranked[offset:offset + limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                backend = getattr(settings, 'RANGO_SEARCH_BACKEND', 'auto')
+                if backend == 'fts5' or (backend == 'auto' and _table_exists()):
+                    _index = FTS5Index()
+                else:
+                    _index = MemoryIndex()
+    return _index
+
+
+def _table_exists():
+    return connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+
+
+def search(query, offset=0, limit=10):
+    return get_index().search(query, offset, limit)
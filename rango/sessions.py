@@ -0,0 +1,226 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import VALID_KEY_CHARS, CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from rango.bulk import MAX_PARAMS, _case, chunks
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rango.sessions:'
+
+
+class SessionWriteBuffer(object):
+    # Session writes waiting to go to the database, newest per session key.
+    # Like rango.counters.CounterBuffer, a background thread writes them
+    # all in one transaction (one SELECT to find the existing rows, one
+    # INSERT and a few CASE ... WHEN UPDATEs) once the oldest is
+    # flush_interval seconds old, or sooner once flush_threshold writes
+    # are waiting, so no request pays for the others' writes. Without a
+    # flush_interval there is no thread and the write that makes the
+    # buffer due flushes it.
+
+    def __init__(self, flush_interval=5.0, flush_threshold=500):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def write(self, session_key, session_data, expire_date):
+        with self._lock:
+            self._pending[session_key] = (session_data, expire_date)
+            if self._oldest is None:
+                self._oldest = time.time()
+            size = len(self._pending)
+        if self.flush_interval:
+            self._ensure_thread()
+            if size >= self.flush_threshold:
+                self._wakeup.set()
+        else:
+            self.maybe_flush()
+
+    def get(self, session_key):
+        with self._lock:
+            return self._pending.get(session_key)
+
+    def discard(self, session_key):
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    def due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            return (len(self._pending) >= self.flush_threshold or
+                    self.flush_interval is not None and time.time() - self._oldest >= self.flush_interval)
+
+    def maybe_flush(self):
+        if self.due():
+            try:
+                self.flush()
+            except Exception:
+                # the writes are still in the cache, and are retried next time
+                logger.exception('Failed to write sessions')
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending, self._oldest = self._pending, {}, None
+            if not pending:
+                return 0
+            try:
+                with transaction.atomic():
+                    self._write(pending)
+            except Exception:
+                with self._lock:
+                    # put back whatever wasn't written again since
+                    for key, value in pending.items():
+                        self._pending.setdefault(key, value)
+                    self._oldest = self._oldest or time.time()
+                raise
+            return len(pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rango-sessions')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.maybe_flush()
+            finally:
+                # the thread keeps its own connection, don't leak it
+                from django.db import connection
+                connection.close()
+
+    def _write(self, pending):
+        for keys in chunks(pending, MAX_PARAMS // 4):
+            existing = set(Session.objects.filter(session_key__in=keys).values_list('session_key', flat=True))
+            Session.objects.bulk_create([Session(session_key=key, session_data=pending[key][0],
+                                                 expire_date=pending[key][1])
+                                         for key in keys if key not in existing])
+            if existing:
+                Session.objects.filter(session_key__in=existing).update(
+                    session_data=_case(Session, 'session_data',
+                                       dict((key, pending[key][0]) for key in existing)),
+                    expire_date=_case(Session, 'expire_date', dict((key, pending[key][1]) for key in existing)),
+                )
+
+    def delete(self, session_key):
+        # Deletes go to the database straight away: a logout must not come
+        # back. Waiting for a running flush means it can't insert the
+        # session again after it is deleted.
+        self.discard(session_key)
+        with self._flush_lock:
+            Session.objects.filter(session_key=session_key).delete()
+
+
+buffer = SessionWriteBuffer(
+    flush_interval=getattr(settings, 'RANGO_SESSION_FLUSH_INTERVAL', 5.0),
+    flush_threshold=getattr(settings, 'RANGO_SESSION_FLUSH_THRESHOLD', 500),
+)
+
+
+@atexit.register
+def flush_at_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception('Failed to write sessions at exit')
+
+
+def sweep_expired(chunk_size=None, pause=None, now=None):
+    # Deletes expired sessions chunk_size rows at a time (by the indexed
+    # expire_date), committing and sleeping `pause` seconds between chunks
+    # so that the write lock is only ever held briefly.
+    # Returns the number of rows deleted.
+    chunk_size = chunk_size or getattr(settings, 'RANGO_SESSION_SWEEP_CHUNK', 500)
+    pause = getattr(settings, 'RANGO_SESSION_SWEEP_PAUSE', 0.05) if pause is None else pause
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        keys = list(Session.objects.filter(expire_date__lt=now)
+                    .values_list('session_key', flat=True)[:chunk_size])
+        if not keys:
+            return deleted
+        deleted += Session.objects.filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+        if pause:
+            time.sleep(pause)
+
+
+class SessionStore(CachedDBStore):
+    # Sessions are read from the cache (then the write buffer, then the
+    # database) and written to the cache at once and to the database in
+    # batches by SessionWriteBuffer. Up to RANGO_SESSION_FLUSH_INTERVAL
+    # seconds of session writes live only in the cache and this process:
+    # use a shared cache (memcached, redis) with more than one process.
+
+    cache_key_prefix = KEY_PREFIX
+
+    def load(self):
+        data = None
+        if self.session_key is not None:
+            try:
+                data = self._cache.get(self.cache_key)
+            except Exception:
+                # some backends reject invalid keys, see cached_db
+                data = None
+            if data is None:
+                pending = buffer.get(self.session_key)
+                if pending is not None and pending[1] > timezone.now():
+                    data = self.decode(pending[0])
+        if data is None:
+            return super(SessionStore, self).load()
+        return data
+
+    def _get_new_session_key(self):
+        # No database lookup: save() refuses keys already in the cache,
+        # and one only left in the table is as likely as a guessed key
+        return get_random_string(32, VALID_KEY_CHARS)
+
+    def exists(self, session_key):
+        return buffer.get(session_key) is not None or super(SessionStore, self).exists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if must_create:
+            # cache.add() fails if the key is taken, as the INSERT would
+            if buffer.get(self.session_key) is not None or \
+                    not self._cache.add(self.cache_key, data, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+        buffer.write(self.session_key, self.encode(data), self.get_expiry_date())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+        buffer.delete(session_key)
+
+    @classmethod
+    def clear_expired(cls):
+        # used by `manage.py clearsessions`
+        sweep_expired()
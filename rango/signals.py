@@ -0,0 +1,126 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rango import api, caching, images, leaderboards, search, slugs, sqlite, trending
+from rango.counters import counters_flushed, counters_flushing
+from rango.models import Category, Page, UserProfile
+
+
+# any change to a category invalidates everything cached in the
+# 'categories' namespace, e.g. the sidebar list
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    caching.bump_generation('categories')
+
+
+# cached pages show categories and pages, any write invalidates them
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def content_changed(sender, **kwargs):
+    caching.bump_generation('content')
+
+
+# the JSON API also shows view and like counts, its version moves
+# with every write, including the counters flushed by rango.counters
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+@receiver(counters_flushed)
+def data_changed(sender, **kwargs):
+    api.bump_data_version()
+
+
+# a rename changes the slug, remember the old one so that
+# both can be dropped from the slug cache once saved
+@receiver(pre_save, sender=Category)
+def remember_previous_slug(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk:
+        instance._previous_slug = Category.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def invalidate_slug(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_slug', None)
+    slugs.resolver.invalidate(*set(slug for slug in (previous, instance.slug) if slug))
+
+
+@receiver(post_delete, sender=Category)
+def invalidate_deleted_slug(sender, instance, **kwargs):
+    slugs.resolver.invalidate(instance.slug)
+
+
+# keep the materialized leaderboards up to date
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Page)
+def update_leaderboard(sender, instance, **kwargs):
+    leaderboards.boards[sender].update_instance(instance)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Page)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    leaderboards.boards[sender].remove(instance.pk)
+
+
+@receiver(counters_flushed)
+def update_leaderboards_after_flush(sender, deltas, **kwargs):
+    for (model, field), changes in deltas.items():
+        board = leaderboards.boards.get(model)
+        if board is not None and board.score_field == field:
+            board.update_ids(changes.keys())
+
+
+# page views also go to the per minute buckets trending pages come from,
+# in the same transaction as the view counts
+@receiver(counters_flushing)
+def record_view_buckets(sender, deltas, **kwargs):
+    trending.record(deltas)
+
+
+# keep the full text search index in step with the tables
+@receiver(post_save, sender=Page)
+def index_page(sender, instance, **kwargs):
+    search.get_index().index_page(instance)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    search.get_index().index_category(instance)
+
+
+@receiver(post_delete, sender=Page)
+def unindex_page(sender, instance, **kwargs):
+    search.get_index().remove(search.PAGE, instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    search.get_index().remove(search.CATEGORY, instance.pk)
+
+
+# a new upload has another name than the stored picture, only then
+# is the picture read (for its digest) and resized
+@receiver(pre_save, sender=UserProfile)
+def remember_picture_change(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = UserProfile.objects.filter(pk=instance.pk).values_list('picture', flat=True).first()
+    instance._picture_changed = previous != instance.picture.name or not instance.picture_hash
+
+
+# resize new profile pictures in the background
+@receiver(post_save, sender=UserProfile)
+def process_profile_picture(sender, instance, **kwargs):
+    if getattr(instance, '_picture_changed', True):
+        images.process_profile(instance)
+
+
+# tune every new SQLite connection, see RANGO_SQLITE_PRAGMAS
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    sqlite.configure_connection(connection)
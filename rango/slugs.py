@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import get_script_prefix, get_urlconf, reverse
+from django.utils.http import urlquote
+from rango import caching
+from rango.models import Category
+
+# stored in the shared cache for slugs that don't exist
+NOT_FOUND = 'rango:not-found'
+
+# stands in for the slug when a slug route is reversed once
+SLUG_PLACEHOLDER = 'rango-slug-placeholder'
+
+# url per (urlconf, script prefix, route name), with SLUG_PLACEHOLDER
+_url_patterns = {}
+
+# what is cached of a category: the counts change all the time and are
+# read from the database when they are needed
+FIELDS = ('id', 'name', 'slug')
+
+
+class SlugResolver(object):
+    # Resolves a category slug to a Category (or None) through two layers:
+    # a small LRU in this process and Django's cache shared by all workers.
+    # Both keep an (id, name, slug) tuple and each lookup gets a Category
+    # of its own, with views and likes deferred: reading them is a query.
+    # Lookups of slugs that don't exist are cached too, for less time.
+    # Category saves and deletes call invalidate(); the local layer has a
+    # short TTL so other processes catch up quickly.
+
+    def __init__(self, max_size=1024, timeout=300, negative_timeout=30, local_timeout=10):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.negative_timeout = negative_timeout
+        self.local_timeout = local_timeout
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, slug):
+        return 'rango:category-slug:%s' % slug
+
+    def resolve(self, slug):
+        now = time.time()
+        with self._lock:
+            entry = self._local.get(slug)
+            if entry is not None and entry[0] > now:
+                self._local.move_to_end(slug)
+                caching.record_hit('slug_local')
+                return self._category(entry[1])
+
+        row = cache.get(self.key(slug))
+        if row is not None:
+            caching.record_hit('slug')
+        else:
+            caching.record_miss('slug')
+            # from the primary, like every cached read (see rango.routers)
+            row = Category.objects.using('default').filter(slug=slug).values_list(*FIELDS).first()
+            if row is not None:
+                cache.set(self.key(slug), row, self.timeout)
+            else:
+                row = NOT_FOUND
+                cache.set(self.key(slug), NOT_FOUND, self.negative_timeout)
+
+        if row == NOT_FOUND:
+            row = None
+            local_timeout = min(self.local_timeout, self.negative_timeout)
+        else:
+            row = tuple(row)
+            local_timeout = self.local_timeout
+        with self._lock:
+            self._local[slug] = (now + local_timeout, row)
+            self._local.move_to_end(slug)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+        return self._category(row)
+
+    def _category(self, row):
+        if row is None:
+            return None
+        return Category.from_db(None, FIELDS, row)
+
+    def invalidate(self, *slugs):
+        with self._lock:
+            for slug in slugs:
+                self._local.pop(slug, None)
+        cache.delete_many([self.key(slug) for slug in slugs])
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+resolver = SlugResolver(
+    max_size=getattr(settings, 'RANGO_SLUG_CACHE_SIZE', 1024),
+    timeout=getattr(settings, 'RANGO_SLUG_CACHE_TIMEOUT', 300),
+    negative_timeout=getattr(settings, 'RANGO_SLUG_NEGATIVE_TIMEOUT', 30),
+    local_timeout=getattr(settings, 'RANGO_SLUG_LOCAL_TIMEOUT', 10),
+)
+
+
+def resolve_category(slug):
+    return resolver.resolve(slug)
+
+
+def slug_url(name, slug):
+    # reverse() for the routes taking a single slug. The url is only
+    # resolved once per route, then the slug is put in its place: the
+    # sidebar would otherwise reverse 'show_category' for every category.
+    key = (settings.ROOT_URLCONF, get_urlconf(), get_script_prefix(), name)
+    pattern = _url_patterns.get(key)
+    if pattern is None:
+        pattern = _url_patterns[key] = reverse(name, args=[SLUG_PLACEHOLDER])
+    return pattern.replace(SLUG_PLACEHOLDER, urlquote(slug), 1)
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+
+def configure_connection(connection):
+    # Applies RANGO_SQLITE_PRAGMAS to every new SQLite connection.
+    # In WAL mode readers don't wait for writers (and the one writer
+    # doesn't wait for readers), so counter flushes and session writes
+    # no longer stall page views.
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'RANGO_SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    cursor = connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+    finally:
+        cursor.close()
@@ -1,9 +1,57 @@
 from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+from rango import caching, images, slugs
 from rango.models import Category
 
 register = template.Library()
 
+
+def get_sidebar():
+    # the sidebar is cached as one pre-rendered <li> per category,
+    # the whole list is invalidated whenever a category is saved or deleted.
+    # It is read from the primary: it is rebuilt right after a write, when
+    # a replica may not have the write yet, and is then kept until the next
+    # write
+    key = caching.versioned_key('categories', 'sidebar')
+    sidebar = cache.get(key)
+    if sidebar is not None:
+        caching.record_hit('sidebar')
+        return sidebar
+
+    caching.record_miss('sidebar')
+    item_template = get_template('rango/cat_item.html')
+    positions = {}
+    items = []
+    for position, cat in enumerate(Category.objects.using('default').values('id', 'name', 'slug')):
+        positions[cat['id']] = position
+        items.append(item_template.render({'c': cat, 'active': False}))
+
+    sidebar = {'positions': positions, 'items': items, 'html': ''.join(items)}
+    cache.set(key, sidebar, None)
+    return sidebar
+
+
 @register.inclusion_tag('rango/cats.html')
 def get_category_list(cat=None):
-    return {'cats': Category.objects.all(), 'act_cat': cat}
+    sidebar = get_sidebar()
+    position = sidebar['positions'].get(getattr(cat, 'id', None))
+    if position is None:
+        return {'cats': mark_safe(sidebar['html'])}
+
+    # only the active category is rendered again, the rest comes from the cache
+    items = list(sidebar['items'])
+    items[position] = get_template('rango/cat_item.html').render({'c': cat, 'active': True})
+    return {'cats': mark_safe(''.join(items))}
+
+
+@register.simple_tag
+def profile_image_url(profile, size=128, fmt='JPEG'):
+    return images.variant_url(profile, size, fmt)
+
 
+@register.simple_tag
+def slug_url(name, slug):
+    # {% url name slug %} for slug routes, resolved once per route
+    return slugs.slug_url(name, slug)
@@ -0,0 +1,39 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+
+logger = logging.getLogger('rango.performance')
+
+# what the last precompile() did, shown on /rango/metrics/
+warmup = {'templates': 0, 'seconds': 0.0}
+
+
+def template_names():
+    # every .html file in the project template directories (TEMPLATES DIRS)
+    for backend in settings.TEMPLATES:
+        for directory in backend.get('DIRS', []):
+            for root, dirs, files in os.walk(directory):
+                for filename in sorted(files):
+                    if filename.endswith('.html'):
+                        yield os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+
+
+def precompile():
+    # Loads and parses every template once, so that with the cached loader
+    # the first requests don't pay for it. A template that doesn't compile
+    # is logged, it would fail the same way when requested.
+    start = time.time()
+    count = 0
+    for name in template_names():
+        try:
+            get_template(name)
+            count += 1
+        except TemplateSyntaxError:
+            logger.exception('Template %s does not compile', name)
+    warmup.update(templates=count, seconds=time.time() - start)
+    logger.info('Precompiled %d templates in %.1fms', count, warmup['seconds'] * 1000)
+    return count
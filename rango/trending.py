@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+from rango import caching
+from rango.bulk import MAX_PARAMS, chunks
+from rango.models import Page, PageViewBucket, PageViewDaily, PageViewHourly, TrendingPage
+
+# The windows trending pages are ranked over, counted in whole buckets:
+# 'hour' is the current and the previous hour, 'day' the last 24 hours
+# and 'week' the last 7 days. The current bucket has only just started,
+# so a window covers up to one bucket more than its name: 'hour' counts
+# the views of the last 60 to 120 minutes, 'day' of the last 23 to 24
+# hours and 'week' of the last 6 to 7 days.
+WINDOWS = ('hour', 'day', 'week')
+
+
+def record(deltas, now=None):
+    # Appends the page views of a counter flush as per minute buckets,
+    # one INSERT however many pages were viewed
+    views = deltas.get((Page, 'views'))
+    if not views:
+        return
+    minute = (now or timezone.now()).replace(second=0, microsecond=0)
+    PageViewBucket.objects.bulk_create(PageViewBucket(page_id=pk, minute=minute, views=delta)
+                                       for pk, delta in views.items() if delta > 0)
+
+
+def _add(model, field, totals):
+    # Adds {(bucket, page_id): views} to the hourly or daily table:
+    # a SELECT of the existing rows, an INSERT of the new ones and an
+    # UPDATE ... SET views = views + n per bucket and distinct n
+    for keys in chunks(totals, MAX_PARAMS // 2):
+        existing = set(model.objects.filter(**{field + '__in': set(key[0] for key in keys),
+                                               'page_id__in': set(key[1] for key in keys)})
+                       .values_list(field, 'page_id'))
+        model.objects.bulk_create(model(page_id=key[1], views=totals[key], **{field: key[0]})
+                                  for key in keys if key not in existing)
+        by_delta = defaultdict(list)
+        for key in keys:
+            if key in existing:
+                by_delta[(key[0], totals[key])].append(key[1])
+        for (bucket, delta), pks in by_delta.items():
+            model.objects.filter(page_id__in=pks, **{field: bucket}).update(views=F('views') + delta)
+
+
+def rollup(now=None):
+    # Moves the buckets of the minutes that are over into the hourly and
+    # daily tables and deletes them, prunes the rollups that are too old
+    # for any window, then ranks the trending pages of each window.
+    # Returns the number of buckets rolled up.
+    now = now or timezone.now()
+    until = now.replace(second=0, microsecond=0)
+    with transaction.atomic():
+        buckets = PageViewBucket.objects.filter(minute__lt=until)
+        last_id = buckets.aggregate(last=Max('id'))['last']
+        rolled = 0
+        if last_id is not None:
+            buckets = buckets.filter(id__lte=last_id)
+            hourly, daily = defaultdict(int), defaultdict(int)
+            # the views of pages deleted since are dropped
+            rows = (buckets.filter(page_id__in=Page.objects.values('pk')).values_list('page_id', 'minute')
+                    .annotate(total=Sum('views')).order_by())
+            for page_id, minute, total in rows.iterator():
+                hourly[(minute.replace(minute=0), page_id)] += total
+                daily[(timezone.localtime(minute).date(), page_id)] += total
+            _add(PageViewHourly, 'hour', hourly)
+            _add(PageViewDaily, 'day', daily)
+            rolled = buckets.delete()[0]
+
+        hours = getattr(settings, 'RANGO_TRENDING_HOURLY_RETENTION', 48)
+        days = getattr(settings, 'RANGO_TRENDING_DAILY_RETENTION', 90)
+        PageViewHourly.objects.filter(hour__lt=until - timedelta(hours=hours)).delete()
+        PageViewDaily.objects.filter(day__lt=timezone.localtime(now).date() - timedelta(days=days)).delete()
+
+        changed = False
+        for window in WINDOWS:
+            changed = rank(window, now) or changed
+    if changed:
+        # the index page shows the trending pages
+        caching.bump_generation('content')
+    return rolled
+
+
+def _window_rows(window, now):
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    if window == 'hour':
+        # the previous hour too, or just after the hour there'd be nothing
+        return PageViewHourly.objects.filter(hour__gte=hour - timedelta(hours=1))
+    if window == 'day':
+        return PageViewHourly.objects.filter(hour__gte=hour - timedelta(hours=23))
+    if window == 'week':
+        return PageViewDaily.objects.filter(day__gte=timezone.localtime(now).date() - timedelta(days=6))
+    raise ValueError('Unknown trending window: {0}'.format(window))
+
+
+def rank(window, now=None):
+    # Replaces the trending pages of a window, returns whether they changed
+    size = getattr(settings, 'RANGO_TRENDING_SIZE', 10)
+    rows = (_window_rows(window, now or timezone.now()).values('page_id').annotate(total=Sum('views'))
+            .order_by('-total', 'page_id').values_list('page_id', 'total')[:size])
+    ranked = list(rows)
+    current = TrendingPage.objects.filter(window=window).order_by('rank')
+    if list(current.values_list('page_id', 'views')) == ranked:
+        return False
+    current.delete()
+    TrendingPage.objects.bulk_create(TrendingPage(window=window, rank=position, page_id=page_id, views=views)
+                                     for position, (page_id, views) in enumerate(ranked, 1))
+    return True
+
+
+def top(window='day'):
+    # The trending pages of a window as dicts (like the leaderboards),
+    # a read of at most RANGO_TRENDING_SIZE rows
+    if window not in WINDOWS:
+        raise ValueError('Unknown trending window: {0}'.format(window))
+    rows = TrendingPage.objects.filter(window=window).order_by('rank').select_related('page')
+    return [{'id': row.page_id, 'title': row.page.title, 'url': row.page.url, 'views': row.views} for row in rows]
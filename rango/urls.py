@@ -7,5 +7,12 @@ urlpatterns = [
     url(r'^add_category/$', views.add_category, name='add_category'),
     url(r'^category/(?P<category_name_slug>[\w\-]+)/$', views.show_category, name='show_category'),
     url(r'^category/(?P<category_name_slug>[\w\-]+)/add_page/$', views.add_page, name='add_page'),
+    url(r'^category/(?P<category_name_slug>[\w\-]+)/pages/$', views.category_pages_json,
+        name='category_pages_json'),
+    url(r'^api/categories/$', views.api_categories, name='api_categories'),
+    url(r'^api/pages/$', views.api_pages, name='api_pages'),
+    url(r'^search/$', views.search_pages, name='search'),
+    url(r'^goto/$', views.goto, name='goto'),
+    url(r'^metrics/$', views.metrics, name='metrics'),
     url(r'^restricted/', views.restricted, name='restricted'),
 ]
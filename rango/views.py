@@ -1,58 +1,77 @@
-from datetime import datetime
-from django.shortcuts import render
+from django.conf import settings
+from django.db.models import F, Q
+from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, HttpResponseNotModified, JsonResponse, \
+    StreamingHttpResponse
 from django.core.urlresolvers import reverse
-from rango.models import Category, Page
+from rango import api, counters, instrumentation, leaderboards, response_cache, search, slugs, trending, visits
+from rango.models import Category, Page, UserProfile
 from rango.forms import CategoryForm, PageForm, UserForm, UserProfileForm
 
 
-# helper method
-def get_server_side_cookie(request, cookie, default_val=None):
-    val = request.session.get(cookie)
-    if not val:
-        val = default_val
-    return val
+# Per user values of the cached pages, see rango.response_cache
+@response_cache.overlay('visits')
+def visits_overlay(request):
+    # Count the visit, stored in the session by default (see rango.visits)
+    return visits.track(request)
+
+
+@response_cache.overlay('username')
+def username_overlay(request):
+    return request.user.get_username()
 
 
 # helper method
-def visitor_cookie_handler(request):
-    # If the visits cookie exists, the value returned is cast to ant int
-    # else default value is 1
-    visits = int(get_server_side_cookie(request, 'visits', '1'))
-
-    last_visit_cookie = get_server_side_cookie(request, 'last_visit', str(datetime.now()))
-    last_visit_time = datetime.strptime(last_visit_cookie[:-7], '%Y-%m-%d %H:%M:%S')
-
-    # if it's been more than 7 days
-    if (datetime.now() - last_visit_time).days > 0:
-        visits = visits + 1
-        # Update the last visit cookie now that we have updated the count
-        request.session['last_visit'] = str(datetime.now())
-    else:
-        request.session['last_visit'] = last_visit_cookie
+def get_category_pages(category, cursor=None, fields=('id', 'title', 'url', 'views', 'dead')):
+    # Keyset pagination: the cursor is the (views, id) of the last page shown,
+    # the next page starts right after it in (-views, -id) order. Unlike
+    # OFFSET this is a seek on the (category, views, id) index, so it costs
+    # the same on the first page and the thousandth.
+    # dead is what rango.links found last time, None if never checked
+    pages = Page.objects.filter(category=category).annotate(dead=F('link_status__dead')).order_by('-views', '-id')
+    if cursor:
+        try:
+            views, pk = [int(part) for part in cursor.split('_')]
+        except ValueError:
+            pass
+        else:
+            # views <= x is what lets the database seek in the index
+            pages = pages.filter(Q(views__lte=views), Q(views__lt=views) | Q(id__lt=pk))
 
-    request.session['visits'] = visits
+    per_page = getattr(settings, 'RANGO_CATEGORY_PAGE_SIZE', 20)
+    # fetch one more than we show to know if there is a next page
+    pages = list(pages.values(*fields)[:per_page + 1])
+    next_cursor = None
+    if len(pages) > per_page:
+        pages = pages[:per_page]
+        next_cursor = '{0}_{1}'.format(pages[-1]['views'], pages[-1]['id'])
+    return pages, next_cursor
 
 
+@response_cache.cache_response
 def index(request):
-    # Query the database for a list of all categories  currently stored
-    # Order the categories by no. likes in descending order
+    # Get the categories ordered by no. likes in descending order
     # Retrieve the top 5 only - or all if less than 5
     # Place the list in our context_dict dictionary
     # that will be passed to the template engine
-
-    category_list = Category.objects.order_by('-likes')[:5]
+    # NB: the leaderboards are materialized in the cache and kept up to
+    # date as counters change, so there is no query here in the steady state
+    category_list = leaderboards.top_categories()
     # Same thing for pages
 
-    page_list = Page.objects.order_by('-views')[:5]
+    page_list = leaderboards.top_pages()
+
+    # and the most viewed of the last day, ranked by the rollup job
+    trending_list = trending.top('day')
 
-    context_dict = {'categories': category_list, 'pages': page_list}
+    context_dict = {'categories': category_list, 'pages': page_list, 'trending': trending_list,
+                    'username': username_overlay(request)}
 
-    # Call the helper function to handle the cookies
-    visitor_cookie_handler(request)
-    context_dict['visits'] = request.session['visits']
+    # Handle the visits cookies
+    context_dict['visits'] = visits_overlay(request)
 
     # Obtain our response to be able to add cookie info
     response = render(request, 'rango/index.html', context_dict)
@@ -61,10 +80,10 @@ def index(request):
     return response
 
 
+@response_cache.cache_response
 def about(request):
-    # Call the helper function to handle the cookies
-    visitor_cookie_handler(request)
-    count = request.session['visits']
+    # Handle the visits cookies
+    count = visits_overlay(request)
 
     # Obtain our response to be able to add cookie info
     response = render(request, 'rango/about.html', {'visits': count})
@@ -73,28 +92,29 @@ def about(request):
     return response
 
 
+@response_cache.cache_response(query_params=('after',))
 def show_category(request, category_name_slug):
     # Create a context dictionary which we can pass
     # to the template rendering engine
     context_dict = {}
-    try:
-        # Try to find a category name slug with the given name
-        # Otherwise .get() raises a DoesNotExist exception
-        # so .get() returns one model instance or raises an exception
-        category = Category.objects.get(slug=category_name_slug)
-
-        # Retrieve all of the associated pages
-        # NB: filter() will return a list of page objects or an empty list
-        pages = Page.objects.filter(category=category)
+    # Try to find a category name slug with the given name
+    # resolve_category() returns one model instance or None,
+    # from the slug cache when it can
+    category = slugs.resolve_category(category_name_slug)
+    if category:
+        # Retrieve one page of the associated pages, the 'after' parameter
+        # is the cursor from the previous page of results
+        pages, next_cursor = get_category_pages(category, request.GET.get('after'))
 
         # Add our results list to the template context under name pages
         context_dict['pages'] = pages
+        context_dict['next_cursor'] = next_cursor
 
         # Also add the category object from the db to the context dictionary
         # To be used in the template to verify that the category exists
         context_dict['category'] = category
 
-    except Category.DoesNotExist:
+    else:
         # the template will display the "no category" message for us
         context_dict['category'] = None
         context_dict['pages'] = None
@@ -103,6 +123,16 @@ def show_category(request, category_name_slug):
     return render(request, 'rango/category.html', context_dict)
 
 
+def category_pages_json(request, category_name_slug):
+    # The same listing as show_category as JSON, for infinite scrolling
+    category = slugs.resolve_category(category_name_slug)
+    if category is None:
+        return JsonResponse({'error': 'The specified category does not exist!'}, status=404)
+
+    pages, next_cursor = get_category_pages(category, request.GET.get('after'))
+    return JsonResponse({'pages': pages, 'next': next_cursor})
+
+
 @login_required
 def add_category(request):
     # three scenarios:
@@ -136,10 +166,7 @@ def add_category(request):
 
 @login_required
 def add_page(request, category_name_slug):
-    try:
-        category = Category.objects.get(slug=category_name_slug)
-    except Category.DoesNotExist:
-        category = None
+    category = slugs.resolve_category(category_name_slug)
 
     form = PageForm()
     if request.method == 'POST':
@@ -157,6 +184,67 @@ def add_page(request, category_name_slug):
     return render(request, 'rango/add_page.html', context_dict)
 
 
+def goto(request):
+    # Redirect to the page's url straight away, the view is only
+    # recorded in memory and written to the db by the counter buffer
+    page_id = request.GET.get('page_id')
+    try:
+        url = Page.objects.values_list('url', flat=True).get(id=int(page_id))
+    except (TypeError, ValueError, Page.DoesNotExist):
+        return redirect('index')
+
+    if getattr(settings, 'RANGO_TRACK_PAGE_VIEWS', True):
+        counters.record_page_view(int(page_id))
+    return redirect(url)
+
+
+def search_pages(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page_number = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page_number = 1
+    per_page = getattr(settings, 'RANGO_SEARCH_PAGE_SIZE', 10)
+
+    # fetch one result more than we show to know if there is a next page
+    results = search.search(query, (page_number - 1) * per_page, per_page + 1)
+
+    context_dict = {'query': query, 'results': results[:per_page], 'page_number': page_number,
+                    'previous_page': page_number - 1,
+                    'next_page': page_number + 1 if len(results) > per_page else None}
+    return render(request, 'rango/search.html', context_dict)
+
+
 @login_required
 def restricted(request):
-    return render(request, 'rango/restricted.html', {})
+    # the profile picture is shown as a resized variant (rango.images)
+    profile = UserProfile.objects.filter(user=request.user).first()
+    return render(request, 'rango/restricted.html', {'profile': profile})
+
+
+@staff_member_required
+def metrics(request):
+    # Per view request metrics in the Prometheus text format
+    return HttpResponse(instrumentation.prometheus_text(), content_type='text/plain; version=0.0.4')
+
+
+def stream_json(request, name, content):
+    # Streams the whole table as JSON. The ETag is the data version,
+    # so an unchanged table costs the client a 304 and us one single-row
+    # read of DataVersion.
+    etag = api.data_etag(name)
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = StreamingHttpResponse(content(), content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def api_categories(request):
+    # All categories, each with its pages (most viewed first)
+    return stream_json(request, 'categories', api.stream_categories)
+
+
+def api_pages(request):
+    return stream_json(request, 'pages', api.stream_pages)
@@ -0,0 +1,119 @@
+import time
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+
+# a visit is counted once per day
+VISIT_INTERVAL = 24 * 60 * 60
+
+COOKIE_SALT = 'rango.visits'
+
+
+class SessionVisitStore(object):
+    # Keeps 'visits' and 'last_visit' in the session, as before.
+    # The keys are only assigned when they change, so a repeat visit
+    # on the same day doesn't mark the session modified and the
+    # session backend doesn't write it back.
+
+    def load(self, request):
+        visits = request.session.get('visits')
+        last_visit = request.session.get('last_visit')
+        if not visits or not last_visit:
+            return None
+        last_visit = datetime.strptime(last_visit.split('.')[0], '%Y-%m-%d %H:%M:%S')
+        return int(visits), time.mktime(last_visit.timetuple())
+
+    def save(self, request, visits, last_visit):
+        request.session['visits'] = visits
+        request.session['last_visit'] = str(datetime.fromtimestamp(last_visit))
+
+
+class SignedCookieVisitStore(object):
+    # Keeps the visit data in a signed cookie, nothing is stored server side.
+
+    cookie_name = 'rango_visits'
+
+    def load(self, request):
+        value = request.get_signed_cookie(self.cookie_name, None, salt=COOKIE_SALT)
+        try:
+            visits, last_visit = value.split(':')
+            return int(visits), float(last_visit)
+        except (AttributeError, ValueError):
+            return None
+
+    def save(self, request, visits, last_visit):
+        set_cookie(request, self.cookie_name, '%d:%d' % (visits, last_visit))
+
+
+class CacheVisitStore(object):
+    # Keeps the visit data in the cache under a random visitor id,
+    # which is the only thing sent in a (signed) cookie.
+
+    cookie_name = 'rango_visitor'
+
+    def visitor_id(self, request):
+        visitor_id = request.get_signed_cookie(self.cookie_name, None, salt=COOKIE_SALT)
+        if visitor_id is None:
+            visitor_id = getattr(request, '_rango_visitor_id', None)
+        if visitor_id is None:
+            visitor_id = request._rango_visitor_id = uuid.uuid4().hex
+            set_cookie(request, self.cookie_name, visitor_id)
+        return visitor_id
+
+    def load(self, request):
+        return cache.get('rango:visits:%s' % self.visitor_id(request))
+
+    def save(self, request, visits, last_visit):
+        cache.set('rango:visits:%s' % self.visitor_id(request), (visits, last_visit),
+                  settings.SESSION_COOKIE_AGE)
+
+
+STORES = {
+    'session': SessionVisitStore,
+    'signed_cookie': SignedCookieVisitStore,
+    'cache': CacheVisitStore,
+}
+
+
+def get_store():
+    return STORES[getattr(settings, 'RANGO_VISIT_STORE', 'session')]()
+
+
+def set_cookie(request, name, value):
+    # written to the response by VisitCookieMiddleware
+    if not hasattr(request, '_rango_visit_cookies'):
+        request._rango_visit_cookies = {}
+    request._rango_visit_cookies[name] = value
+
+
+def track(request):
+    # Returns the number of days the visitor has been here,
+    # only writing to the store when that changes
+    store = get_store()
+    now = time.time()
+    data = store.load(request)
+    if data is None:
+        visits = 1
+        store.save(request, visits, now)
+    else:
+        visits, last_visit = data
+        if now - last_visit > VISIT_INTERVAL:
+            visits = visits + 1
+            store.save(request, visits, now)
+    return visits
+
+
+class VisitCookieMiddleware(object):
+    # Sets the cookies of the signed cookie and cache visit stores
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        for name, value in getattr(request, '_rango_visit_cookies', {}).items():
+            response.set_signed_cookie(name, value, salt=COOKIE_SALT, max_age=settings.SESSION_COOKIE_AGE,
+                                       httponly=True)
+        return response
@@ -0,0 +1,69 @@
+"""
+ASGI config for tango_with_django_project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+to be served by e.g. ``uvicorn tango_with_django_project.asgi:application``.
+
+Django 1.11 has no ASGI support (nor async views, which need Django 3.1), so
+this wraps the WSGI application with asgiref's WsgiToAsgi adapter
+(``pip install asgiref``). The ASGI server keeps connections on its event
+loop and only hands a request to a thread once it has fully arrived, so slow
+clients no longer hold a worker thread each. Requests run in a pool of
+RANGO_ASGI_THREADS threads.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tango_with_django_project.settings")
+
+try:
+    from asgiref.sync import sync_to_async
+    from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+except ImportError:
+    raise ImproperlyConfigured('The ASGI entry point needs asgiref: pip install asgiref')
+
+from tango_with_django_project.wsgi import application as wsgi_application
+
+
+def strip_header_values(application):
+    # Django 1.11 writes Set-Cookie values with a leading space, which WSGI
+    # servers accept and h11 (uvicorn's HTTP parser) refuses
+    def wrapper(environ, start_response):
+        def strip_start_response(status, headers, exc_info=None):
+            return start_response(status, [(name, value.strip()) for name, value in headers], exc_info)
+        return application(environ, strip_start_response)
+    return wrapper
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs the WSGI application "thread sensitive", which without a
+    # thread_sensitive context (Python 3.6) is one thread for the whole
+    # process: a slow view would hold up every other request. Each request
+    # runs in its own thread of the pool instead, as under a threaded WSGI
+    # server; Django keeps a database connection per thread.
+    executor = None
+
+    def run_wsgi_app(self, body):
+        # the plain function under asgiref's @sync_to_async
+        run = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+        return sync_to_async(run, thread_sensitive=False, executor=self.executor)(self, body)
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+
+    def __init__(self, wsgi_application, threads):
+        super(ThreadPoolWsgiToAsgi, self).__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        instance = ThreadPoolWsgiToAsgiInstance(self.wsgi_application)
+        instance.executor = self.executor
+        await instance(scope, receive, send)
+
+
+application = ThreadPoolWsgiToAsgi(strip_header_values(wsgi_application),
+                                   getattr(settings, 'RANGO_ASGI_THREADS', 16))
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tango_with_django_project.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.RANGO_ASSET_MODE:
+    # static and media files never reach Django
+    from rango.assets import AssetServer
+    application = AssetServer(application, [(settings.STATIC_URL, settings.STATIC_ROOT),
+                                             (settings.MEDIA_URL, settings.MEDIA_ROOT)])